@@ -0,0 +1,5 @@
+"""Market basket analysis for the BasketBuddy Telegram bots (script1.py .. script6.py).
+
+The plotting and mining libraries are imported on first use (lazy.py), so importing
+this package or a bot stays fast.
+"""
@@ -0,0 +1,74 @@
+"""Run a bot's pipeline on a local CSV, without Telegram.
+
+    python -m basketbuddy data.csv                               # the default pipeline
+    python -m basketbuddy data.csv --preset script6 --output out
+    python -m basketbuddy data.csv --preset script5 --stage mine=single --set min_support=0.02
+    python -m basketbuddy data.csv --until rules                 # stop after a stage
+
+The report is printed and the rendered files are copied to --output. Fetching and
+delivery default to the local steps; --stage swaps any stage's step ("name",
+"a,b" for several, or "module:function"). Per-stage timings go to stderr.
+"""
+import argparse
+import json
+import sys
+import tempfile
+
+from .pipeline import STAGES, Context, Pipeline, PipelineError
+from .presets import PRESETS, make_config, merge
+
+
+def parse_assignment(text):
+    # "key=value", the value parsed as JSON when it is, e.g. 0.02 or [0.01, 0.05]; a plain string otherwise
+    key, _, value = text.partition('=')
+    try:
+        return key, json.loads(value)
+    except ValueError:
+        return key, value
+
+
+def build_config(args):
+    overrides = {"stages": {"fetch": "local", "deliver": "local"}}
+    if args.config:
+        with open(args.config) as f:
+            overrides = merge(overrides, json.load(f))
+    for assignment in args.stage:
+        stage, names = assignment.split('=', 1)
+        if stage not in STAGES:
+            raise ValueError(f"Unknown stage {stage!r}, expected one of {', '.join(STAGES)}")
+        overrides = merge(overrides, {"stages": {stage: names.split(',') if names else []}})
+    overrides = merge(overrides, {"params": dict(parse_assignment(assignment) for assignment in args.set)})
+    return make_config(args.preset, overrides)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m basketbuddy', description=__doc__.splitlines()[0])
+    parser.add_argument('csv', help="Transaction CSV (one-hot, baskets per row or transaction_id,item pairs)")
+    parser.add_argument('--preset', choices=sorted(PRESETS), help="Start from a bot's config")
+    parser.add_argument('--config', help="JSON file of config overrides")
+    parser.add_argument('--stage', action='append', default=[], metavar='STAGE=STEP', help="Swap a stage's steps")
+    parser.add_argument('--set', action='append', default=[], metavar='KEY=VALUE', help="Override a mining parameter")
+    parser.add_argument('--until', choices=STAGES, help="Stop after this stage")
+    parser.add_argument('--output', default='.', help="Directory for the rendered files")
+    args = parser.parse_args(argv)
+
+    try:
+        pipeline = Pipeline(build_config(args))
+    except ValueError as e:
+        parser.error(str(e))
+    stages = STAGES[:STAGES.index(args.until) + 1] if args.until else STAGES
+
+    with tempfile.TemporaryDirectory(prefix='basketbuddy-cli-') as workdir:
+        ctx = Context(args.csv, 'local', pipeline.config['params'], pipeline, workdir=workdir, output_dir=args.output,
+                      notify=lambda text: print(text, file=sys.stderr))
+        try:
+            pipeline.run(ctx, stages)
+        except PipelineError as e:
+            print(f"Error in the {e.stage} stage: {e.error}", file=sys.stderr)
+            return 1
+        finally:
+            for stage, seconds in ctx.trace.stages.items():
+                print(f"{stage}: {seconds:.4f} s", file=sys.stderr)
+            for name, value in ctx.trace.counts.items():
+                print(f"{name}: {value}", file=sys.stderr)
+    return 0
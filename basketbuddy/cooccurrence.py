@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from .encoding import TransactionMatrix
+
+# association_rules' columns in its order, so pair rules go wherever its output goes
+RULE_COLUMNS = [
+    'antecedents', 'consequents', 'antecedent support', 'consequent support', 'support', 'confidence', 'lift',
+    'representativity', 'leverage', 'conviction', 'zhangs_metric', 'jaccard', 'certainty', 'kulczynski',
+]
+
+
+def as_transactions(df):
+    """TransactionMatrix of a one-hot DataFrame, sparse or dense. A TransactionMatrix is returned as is."""
+    if isinstance(df, TransactionMatrix):
+        return df
+    if len(df.columns) and all(isinstance(dtype, pd.SparseDtype) for dtype in df.dtypes):
+        return TransactionMatrix(df.sparse.to_coo(), df.columns)
+    return TransactionMatrix(sp.csr_matrix(df.to_numpy() != 0), df.columns)
+
+
+class Cooccurrence:
+    """Supports of every item and every item pair from one sparse product X.T @ X.
+
+    That is enough for all single-item -> single-item rules (`rules`) without
+    association_rules, and for the frequent pairs that deeper mining starts from
+    (`seed`). Accepts a TransactionMatrix or a one-hot DataFrame.
+    """
+
+    def __init__(self, transactions):
+        transactions = as_transactions(transactions)
+        # Integer counts, a boolean product would stop at True
+        X = transactions.matrix.astype(np.int32)
+        self.items = transactions.items
+        self.n_transactions = transactions.n_transactions
+        n = max(self.n_transactions, 1)
+        self.item_supports = np.asarray(X.sum(axis=0), dtype=np.float64).ravel() / n
+        # Upper triangle only: each unordered pair once, the diagonal is item_supports
+        pairs = sp.triu(X.T @ X, k=1).tocoo()
+        self.pair_items = np.stack([pairs.row, pairs.col], axis=1).astype(np.int64)
+        self.pair_supports = pairs.data.astype(np.float64) / n
+
+    def frequent_pairs(self, min_support):
+        """(pair_items, supports) of the pairs with support >= min_support."""
+        frequent = self.pair_supports >= min_support
+        return self.pair_items[frequent], self.pair_supports[frequent]
+
+    def seed(self, min_support):
+        """Boolean mask of the items in at least one frequent pair.
+
+        Only these can be in a frequent itemset of 2 or more items (the apriori
+        property), so deeper mining can start from their columns alone.
+        """
+        pairs, _ = self.frequent_pairs(min_support)
+        mask = np.zeros(len(self.items), dtype=bool)
+        mask[pairs.ravel()] = True
+        return mask
+
+    def itemsets(self, min_support, max_len=2):
+        """Frequent items and (unless max_len is 1) pairs, laid out like apriori's output."""
+        items = np.flatnonzero(self.item_supports >= min_support)
+        supports = [self.item_supports[items]]
+        itemsets = [frozenset([item]) for item in self.items[items]]
+        if max_len is None or max_len >= 2:
+            pairs, pair_supports = self.frequent_pairs(min_support)
+            supports.append(pair_supports)
+            itemsets += [frozenset(pair) for pair in zip(self.items[pairs[:, 0]], self.items[pairs[:, 1]])]
+        return pd.DataFrame({'support': np.concatenate(supports), 'itemsets': itemsets})
+
+    def rules(self, min_support, metric="confidence", min_threshold=0.7):
+        """Every single-item -> single-item rule of the frequent pairs, as association_rules returns them.
+
+        Both directions of each pair, all metrics computed on whole arrays, and only
+        the rules with `metric` >= `min_threshold` kept.
+        """
+        if metric not in RULE_COLUMNS[2:]:
+            raise ValueError(f"Unknown rule metric: {metric}")
+        pairs, supports = self.frequent_pairs(min_support)
+        antecedents = np.concatenate([pairs[:, 0], pairs[:, 1]])
+        consequents = np.concatenate([pairs[:, 1], pairs[:, 0]])
+        sAC = np.concatenate([supports, supports])
+        sA = self.item_supports[antecedents]
+        sC = self.item_supports[consequents]
+
+        confidence = sAC / sA
+        leverage = sAC - sA * sC
+        with np.errstate(divide='ignore', invalid='ignore'):
+            conviction = np.where(confidence < 1, (1 - sC) / (1 - confidence), np.inf)
+            zhang_denominator = np.maximum(sAC * (1 - sA), sA * (sC - sAC))
+            zhangs_metric = np.where(zhang_denominator == 0, 0, leverage / zhang_denominator)
+            certainty = np.where(sC == 1, 0, (confidence - sC) / (1 - sC))
+        columns = {
+            'antecedent support': sA,
+            'consequent support': sC,
+            'support': sAC,
+            'confidence': confidence,
+            'lift': confidence / sC,
+            'representativity': np.ones(len(sAC)),
+            'leverage': leverage,
+            'conviction': conviction,
+            'zhangs_metric': zhangs_metric,
+            'jaccard': sAC / (sA + sC - sAC),
+            'certainty': certainty,
+            'kulczynski': (sAC / sA + sAC / sC) / 2,
+        }
+
+        keep = columns[metric] >= min_threshold
+        singletons = _singletons(self.items)
+        rules = pd.DataFrame({'antecedents': singletons[antecedents[keep]], 'consequents': singletons[consequents[keep]]})
+        for name, values in columns.items():
+            rules[name] = values[keep]
+        return rules
+
+
+def _singletons(items):
+    # One frozenset per item, built once and shared by every rule that mentions it
+    singletons = np.empty(len(items), dtype=object)
+    singletons[:] = [frozenset([item]) for item in items]
+    return singletons
@@ -0,0 +1,84 @@
+import gzip
+import importlib.util
+import shutil
+import tempfile
+import zipfile
+from contextlib import contextmanager
+
+import pandas as pd
+
+# Telegram's Bot API refuses to serve files above 20 MB to bots anyway
+MAX_DOWNLOAD_BYTES = 20 * 1024 * 1024
+# Cap on the unpacked size of a gzip/zip upload, so a small archive can't fill the disk
+MAX_UNPACKED_BYTES = 500 * 1024 * 1024
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZIP_MAGIC = b'PK\x03\x04'
+
+HAS_PYARROW = importlib.util.find_spec('pyarrow') is not None
+
+
+@contextmanager
+def fetch_upload(telegram, file_id, max_bytes=MAX_DOWNLOAD_BYTES, max_unpacked_bytes=MAX_UNPACKED_BYTES):
+    """Download an upload into a private temp directory and yield the path of its CSV.
+
+    gzip and zip uploads are unpacked first. The directory is removed on exit.
+    """
+    directory = tempfile.mkdtemp(prefix='basketbuddy-')
+    try:
+        yield unpack(telegram.download_file(file_id, directory, max_bytes), max_unpacked_bytes)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def unpack(path, max_bytes=MAX_UNPACKED_BYTES):
+    """Path of the CSV inside `path`, decompressing gzip and zip files next to it.
+
+    The format is told by the file's magic bytes, not its name.
+    """
+    with open(path, 'rb') as f:
+        magic = f.read(4)
+
+    if magic.startswith(GZIP_MAGIC):
+        with gzip.open(path, 'rb') as src:
+            return _copy_capped(src, path + '.csv', max_bytes)
+
+    if magic == ZIP_MAGIC:
+        with zipfile.ZipFile(path) as archive:
+            members = [info for info in archive.infolist() if not info.is_dir()]
+            csv_members = [info for info in members if info.filename.lower().endswith('.csv')]
+            if not (csv_members or members):
+                raise ValueError("The zip file is empty.")
+            member = (csv_members or members)[0]
+            if member.file_size > max_bytes:
+                raise ValueError(f"The unpacked file is too large (limit {max_bytes / 1e6:.1f} MB).")
+            with archive.open(member) as src:
+                return _copy_capped(src, path + '.csv', max_bytes)
+
+    return path
+
+
+def _copy_capped(src, dest, max_bytes, block_size=1 << 20):
+    written = 0
+    with open(dest, 'wb') as out:
+        for block in iter(lambda: src.read(block_size), b''):
+            written += len(block)
+            if written > max_bytes:
+                raise ValueError(f"The unpacked file is too large (limit {max_bytes / 1e6:.1f} MB).")
+            out.write(block)
+    return dest
+
+
+def csv_engine_kwargs(chunked=False):
+    """read_csv arguments for the fastest parser that works on a local file.
+
+    pyarrow is multithreaded but can't read in chunks; the C engine memory-maps the file.
+    """
+    if HAS_PYARROW and not chunked:
+        return {'engine': 'pyarrow'}
+    return {'engine': 'c', 'memory_map': True}
+
+
+def read_csv_local(path, **kwargs):
+    """pd.read_csv on a downloaded file with the fast parser."""
+    return pd.read_csv(path, **csv_engine_kwargs(), **kwargs)
@@ -0,0 +1,132 @@
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from .formats import BASKET, LONG, sniff_format
+
+# Candidate itemsets counted per sparse product, bounds the size of the intermediate matrix
+COUNT_BATCH = 2048
+
+
+class TransactionMatrix:
+    """Transactions as a sparse boolean matrix: one row per transaction, one column per item.
+
+    `items` is the item-id vocabulary, column j of the matrix is item `items[j]`.
+    """
+
+    def __init__(self, matrix, items, transaction_ids=None):
+        self.matrix = sp.csr_matrix(matrix, dtype=bool)
+        self.items = pd.Index(items)
+        self.transaction_ids = transaction_ids
+
+    @property
+    def n_transactions(self):
+        return self.matrix.shape[0]
+
+    @property
+    def n_items(self):
+        return self.matrix.shape[1]
+
+    def item_ids(self, items):
+        """Vocabulary ids for item names, -1 for items that are not in the vocabulary."""
+        return self.items.get_indexer(items)
+
+    def to_frame(self):
+        """Sparse boolean DataFrame that apriori/fpgrowth accept directly."""
+        return pd.DataFrame.sparse.from_spmatrix(self.matrix, columns=self.items)
+
+    def memory_footprint(self):
+        """Bytes used by this matrix next to the bit-packed and the old dense int64 layouts."""
+        sparse_bytes = self.matrix.data.nbytes + self.matrix.indices.nbytes + self.matrix.indptr.nbytes
+        return {
+            "transactions": self.n_transactions,
+            "items": self.n_items,
+            "nonzeros": int(self.matrix.nnz),
+            "sparse_bytes": int(sparse_bytes),
+            "bitpacked_bytes": self.n_transactions * ((self.n_items + 7) // 8),
+            "dense_int64_bytes": self.n_transactions * self.n_items * 8,
+        }
+
+
+def encode_transactions(df, fmt=None):
+    """One-hot encode transactions without building a Series per basket.
+
+    `fmt` is the DataFormat from sniff_format; it is sniffed here when not given. Wide
+    rows, long `transaction_id,item` pairs, delimited baskets and frames that are
+    already one-hot or boolean each go through their own vectorized parser.
+    """
+    fmt = fmt or sniff_format(df)
+    if fmt.is_one_hot:
+        return encode_one_hot(df)
+    if fmt.kind == LONG:
+        return encode_long(df, fmt.transaction_col, fmt.item_col)
+    if fmt.kind == BASKET:
+        return encode_baskets(df.iloc[:, 0], fmt.delimiter)
+    return encode_wide(df)
+
+
+def encode_one_hot(df):
+    return TransactionMatrix(sp.csr_matrix(df.to_numpy() != 0), df.columns.astype(str), df.index.to_numpy())
+
+
+def encode_wide(df):
+    values = df.to_numpy(dtype=object).ravel()
+    rows = np.repeat(np.arange(len(df)), df.shape[1])
+    present = pd.notna(values)
+    return _build(rows[present], values[present].astype(str), df.index.to_numpy())
+
+
+def encode_baskets(baskets, delimiter):
+    items = baskets.reset_index(drop=True).astype('string').str.split(delimiter).explode().str.strip()
+    items = items[items.notna() & (items != '')]
+    return _build(items.index.to_numpy(), items.to_numpy(dtype=str), baskets.index.to_numpy())
+
+
+def encode_long(df, transaction_col, item_col):
+    pairs = df[[transaction_col, item_col]].dropna()
+    rows, transaction_ids = pd.factorize(pairs[transaction_col])
+    return _build(rows, pairs[item_col].astype(str).to_numpy(), np.asarray(transaction_ids))
+
+
+def _build(rows, items, transaction_ids):
+    # Sorted vocabulary keeps the column order of the old stack/unstack pivot
+    cols, vocabulary = pd.factorize(items, sort=True)
+    # Baskets with no items at all are dropped, as df.stack() used to do
+    used_rows, rows = np.unique(rows, return_inverse=True)
+    matrix = sp.csr_matrix(
+        (np.ones(len(rows), dtype=bool), (rows, cols)),
+        shape=(len(used_rows), len(vocabulary)),
+    )
+    # Repeated items in a basket were summed above, collapse them back to True
+    matrix.sum_duplicates()
+    matrix.data[:] = True
+    return TransactionMatrix(matrix, vocabulary, transaction_ids[used_rows])
+
+
+def count_itemsets(transactions, itemsets):
+    """Number of transactions containing each itemset (frozensets of item names).
+
+    Itemsets are counted a batch at a time with one sparse product per batch: a
+    transaction contains an itemset of size k when it hits k of its items.
+    """
+    ids = {item: i for i, item in enumerate(transactions.items)}
+    counts = np.zeros(len(itemsets), dtype=np.int64)
+    X = transactions.matrix.astype(np.int32)
+
+    by_size = defaultdict(list)
+    for position, itemset in enumerate(itemsets):
+        # An itemset with an item this data doesn't have never occurs in it
+        if all(item in ids for item in itemset):
+            by_size[len(itemset)].append(position)
+
+    for size, positions in by_size.items():
+        for start in range(0, len(positions), COUNT_BATCH):
+            batch = positions[start:start + COUNT_BATCH]
+            rows = [ids[item] for position in batch for item in itemsets[position]]
+            cols = np.repeat(np.arange(len(batch)), size)
+            members = sp.csr_matrix((np.ones(len(rows), dtype=np.int32), (rows, cols)), shape=(transactions.n_items, len(batch)))
+            hits = (X @ members).tocsr()
+            counts[batch] = np.bincount(hits.indices[hits.data == size], minlength=len(batch))
+    return counts
@@ -0,0 +1,69 @@
+import re
+from collections import namedtuple
+
+import pandas as pd
+
+ONE_HOT = 'one_hot'  # 0/1 columns, one per item
+BOOL = 'bool'        # True/False columns, one per item
+LONG = 'long'        # transaction_id,item pairs
+BASKET = 'basket'    # one column, each cell holds a delimited basket ("Bread;Milk")
+WIDE = 'wide'        # one basket per row, item names spread over the columns
+
+# Column names that mark the transaction id column of a long-format file
+TRANSACTION_COLUMN_HINTS = ('transaction', 'order', 'invoice', 'basket', 'receipt', 'ticket', 'id')
+BASKET_DELIMITERS = (';', ',', '|')
+
+DataFormat = namedtuple('DataFormat', ['kind', 'transaction_col', 'item_col', 'delimiter', 'sampled'])
+DataFormat.__new__.__defaults__ = (None, None, None, False)
+DataFormat.is_one_hot = property(lambda self: self.kind in (ONE_HOT, BOOL))
+
+
+def sniff_format(df, sample_rows=10000, random_state=0):
+    """Work out how the transactions in `df` are laid out from dtypes and column value sets.
+
+    Only `sample_rows` randomly chosen rows are inspected on large inputs. The returned
+    DataFormat tells encode_transactions which parser to use, so the data is not scanned
+    again to find out.
+    """
+    sampled = len(df) > sample_rows
+    sample = df.sample(n=sample_rows, random_state=random_state) if sampled else df
+
+    if len(df.columns) and all(pd.api.types.is_bool_dtype(dtype) for dtype in df.dtypes):
+        return DataFormat(BOOL, sampled=sampled)
+
+    if len(df.columns) and all(pd.api.types.is_numeric_dtype(dtype) for dtype in df.dtypes):
+        values = sample.to_numpy()
+        if ((values == 0) | (values == 1)).all():
+            return DataFormat(ONE_HOT, sampled=sampled)
+
+    if len(df.columns) == 2:
+        transaction_col = _transaction_column(sample)
+        if transaction_col is not None:
+            item_col = next(col for col in df.columns if col != transaction_col)
+            return DataFormat(LONG, transaction_col=transaction_col, item_col=item_col, sampled=sampled)
+
+    if len(df.columns) == 1 and pd.api.types.is_string_dtype(df.dtypes.iloc[0]):
+        cells = sample.iloc[:, 0].dropna().astype(str)
+        counts = {delimiter: cells.str.count(re.escape(delimiter)).sum() for delimiter in BASKET_DELIMITERS}
+        delimiter = max(counts, key=counts.get)
+        if counts[delimiter]:
+            return DataFormat(BASKET, delimiter=delimiter, sampled=sampled)
+
+    return DataFormat(WIDE, sampled=sampled)
+
+
+def _transaction_column(sample):
+    # Hints are in priority order so "order_id" wins over "product_id"
+    for hint in TRANSACTION_COLUMN_HINTS:
+        for col in sample.columns:
+            if hint in str(col).lower():
+                return col
+
+    # Unnamed pairs: an integer id column that repeats next to a text item column
+    first, second = sample.columns
+    if (pd.api.types.is_integer_dtype(sample[first].dtype)
+            and pd.api.types.is_string_dtype(sample[second].dtype)
+            and sample[first].nunique() < len(sample)):
+        return first
+    return None
+
@@ -0,0 +1,277 @@
+import math
+from collections import namedtuple
+
+import numpy as np
+import scipy.sparse as sp
+
+from .cooccurrence import Cooccurrence, as_transactions
+from .loader import available_memory
+from .mining import choose_engine
+
+# Per-unit costs of fpgrowth and association_rules, fitted on bench.py data (60,000
+# transactions: 1,000 items in baskets of 10, and a dense 200 items in baskets of 20
+# with long patterns, where 8,736 itemsets took 21 s to mine and 158,874 candidate rules 1 s).
+# Mining costs a pass over the matrix plus time per itemset found; association_rules
+# grows with the candidate rules (every non-trivial split of every itemset), and so
+# does its peak memory
+SECONDS_PER_NONZERO = 3e-6
+SECONDS_PER_ITEMSET = 2e-3
+SECONDS_PER_RULE_CANDIDATE = 7e-6
+BYTES_PER_ITEMSET = 500
+BYTES_PER_RULE_CANDIDATE = 150
+# mlxtend's apriori tests all candidates of a level at once on dense n_transactions x
+# candidates boolean arrays (the comparison, the running AND and a copy)
+APRIORI_BYTES_PER_CELL = 3
+
+# Default budget for one mining run: this many seconds and half the free memory
+DEFAULT_TIME_BUDGET = 120
+# The time estimate was within this factor of the measured time on bench.py data, so the
+# requested parameters are only changed once it is this far over the time budget
+TIME_TOLERANCE = 1.5
+# max_len is never capped below this; short rules are what users read
+MIN_GUARDED_MAX_LEN = 3
+# Longest itemsets the estimate looks at when max_len isn't set
+ESTIMATE_MAX_LEN = 20
+# A level with more candidates than this is over any budget; it isn't enumerated
+MAX_ESTIMATE_CANDIDATES = 5000000
+# Level 3 is counted exactly while the frequent pairs' transactions times the mean basket
+# size stay under this (about a second); past it it's estimated like the longer levels
+EXACT_COUNT_WORK = 2e8
+# Frequent pairs whose transactions are intersected per sparse product
+EXACT_COUNT_BATCH = 256
+# Steps of the binary search (over log min_support) for the lowest threshold that fits
+SEARCH_STEPS = 12
+
+Estimate = namedtuple('Estimate', ['min_support', 'max_len', 'itemsets_by_len', 'candidates_by_len', 'rule_candidates',
+                                   'seconds', 'bytes', 'apriori_bytes'])
+MiningPlan = namedtuple('MiningPlan', ['min_support', 'max_len', 'engine', 'requested_support', 'requested_max_len', 'estimate', 'fits'])
+MiningPlan.adjusted = property(lambda self: (self.min_support, self.max_len) != (self.requested_support, self.requested_max_len))
+
+
+class ItemsetEstimator:
+    """Predicts how many frequent itemsets and rules a threshold yields, without mining.
+
+    Frequent items and pairs are counted exactly from the item co-occurrence counts
+    (cooccurrence.py), and 3-itemsets from the frequent pairs' transactions. Longer
+    itemsets are generated level by level as apriori would, with their support
+    estimated from the two itemsets they were joined from: the two new items are taken
+    as independent given the shared prefix, supp(left) * supp(right) / supp(prefix).
+    On bench.py data this was within 20% of the real count up to 0.05 and ran a bit
+    low for the longest itemsets, which the time tolerance of plan_mining covers.
+    """
+
+    def __init__(self, transactions, pairs=None):
+        transactions = as_transactions(transactions)
+        pairs = pairs or Cooccurrence(transactions)
+        self.matrix = transactions.matrix
+        self.n_transactions = pairs.n_transactions
+        self.item_supports = pairs.item_supports
+        self.pair_supports = pairs.pair_supports
+        self.pair_items = pairs.pair_items
+        # (min_support, sorted candidate keys, counts) of the last exact level-3 count
+        self._triples = None
+
+    def itemsets_by_len(self, min_support, max_len=None, limit=None):
+        """Estimated numbers of frequent itemsets and of candidates of each length 1..max_len.
+
+        Returns (itemsets, candidates), two lists. Stops early once `limit` itemsets are
+        reached or a level would have more than MAX_ESTIMATE_CANDIDATES candidates
+        (counted as that many itemsets).
+        """
+        max_len = min(max_len or ESTIMATE_MAX_LEN, ESTIMATE_MAX_LEN)
+        n_items = len(self.item_supports)
+        counts = [int((self.item_supports >= min_support).sum())]
+        candidates = [n_items]
+        frequent = self.pair_supports >= min_support
+        if max_len < 2:
+            return counts, candidates
+        counts.append(int(frequent.sum()))
+        candidates.append(counts[0] * (counts[0] - 1) // 2)
+
+        level = self.pair_items[frequent]
+        supports = self.pair_supports[frequent]
+        order = np.lexsort(level.T[::-1])
+        level, log_supports = level[order], np.log(supports[order])
+        pair_keys = np.sort(level[:, 0] * n_items + level[:, 1])
+        # Each row's support without its last item, the prefix it shares with its join partners
+        log_prefixes = np.log(self.item_supports[level[:, 0]])
+        log_threshold = math.log(min_support)
+        exact = supports.sum() * self.matrix.nnz <= EXACT_COUNT_WORK
+
+        while len(counts) < max_len and len(level) and (limit is None or sum(counts) < limit):
+            left, right = _join_pairs(level)
+            candidates.append(len(left))
+            if len(left) > MAX_ESTIMATE_CANDIDATES:
+                counts.append(len(left))
+                break
+            new_items = level[right, -1]
+            # The right row's pairs are frequent; the candidate also needs the pair of the
+            # two last items (the apriori property)
+            has_pair = _contains(pair_keys, level[left, -1], new_items, n_items)
+            left, right, new_items = left[has_pair], right[has_pair], new_items[has_pair]
+            if len(counts) == 2 and exact:
+                with np.errstate(divide='ignore'):
+                    estimated = np.log(self._triple_counts(min_support, level, left, new_items) / self.n_transactions)
+            else:
+                estimated = log_supports[left] + log_supports[right] - log_prefixes[left]
+            keep = estimated >= log_threshold
+            log_prefixes = log_supports[left[keep]]
+            level = np.concatenate([level[left[keep]], new_items[keep, None]], axis=1)
+            log_supports = estimated[keep]
+            counts.append(len(level))
+        return counts, candidates
+
+    def _triple_counts(self, min_support, pairs, left, new_items):
+        # Exact counts of pairs[left] + new_items. The candidates at a higher threshold are
+        # a subset of those at a lower one, so the counts of the lowest one asked are kept
+        n_items = len(self.item_supports)
+        keys = (pairs[left, 0] * n_items + pairs[left, 1]) * n_items + new_items
+        if self._triples is None or self._triples[0] > min_support:
+            self._triples = (min_support, keys, self._count_triples(pairs, left, new_items))
+        _, known, counts = self._triples
+        return counts[np.searchsorted(known, keys)]
+
+    def _count_triples(self, pairs, left, new_items):
+        # The transactions of a batch of pairs (the product of their items' columns) times
+        # the item columns. `left` is sorted, so the candidates of a batch are contiguous
+        X = self.matrix.tocsc().astype(np.int32)
+        counts = np.zeros(len(left), dtype=np.int64)
+        for start in range(0, len(pairs), EXACT_COUNT_BATCH):
+            batch = pairs[start:start + EXACT_COUNT_BATCH]
+            first, last = np.searchsorted(left, [start, start + len(batch)])
+            if first == last:
+                continue
+            holders = sp.csc_matrix(X[:, batch[:, 0]].multiply(X[:, batch[:, 1]]))
+            hits = (holders.T @ X).tocsr()
+            counts[first:last] = np.asarray(hits[left[first:last] - start, new_items[first:last]]).ravel()
+        return counts
+
+    def estimate(self, min_support, max_len=None, limit=None):
+        by_len, candidates = self.itemsets_by_len(min_support, max_len, limit)
+        rule_candidates = sum(count * (2 ** k - 2) for k, count in enumerate(by_len, 1))
+        itemsets = sum(by_len)
+        return Estimate(
+            min_support, max_len, by_len, candidates, rule_candidates,
+            self.matrix.nnz * SECONDS_PER_NONZERO + itemsets * SECONDS_PER_ITEMSET + rule_candidates * SECONDS_PER_RULE_CANDIDATE,
+            itemsets * BYTES_PER_ITEMSET + rule_candidates * BYTES_PER_RULE_CANDIDATE,
+            max(candidates[1:], default=0) * self.n_transactions * APRIORI_BYTES_PER_CELL,
+        )
+
+
+def _join_pairs(level):
+    """(left, right) row indices of every pair of rows sharing all but their last item.
+
+    `level` is sorted lexicographically, so each prefix is a contiguous run and joining
+    a row with the later rows of its run yields the candidates in sorted order too.
+    """
+    new_prefix = np.any(level[1:, :-1] != level[:-1, :-1], axis=1)
+    starts = np.flatnonzero(np.concatenate([[True], new_prefix]))
+    ends = np.append(starts[1:], len(level))
+    partners = np.repeat(ends, ends - starts) - np.arange(len(level)) - 1
+    left = np.repeat(np.arange(len(level)), partners)
+    right = left + 1 + np.arange(len(left)) - np.repeat(np.cumsum(partners) - partners, partners)
+    return left, right
+
+
+def _contains(keys, a, b, n_items):
+    # Whether each pair (a, b) has a key in the sorted `keys`
+    query = np.minimum(a, b) * n_items + np.maximum(a, b)
+    if not len(keys):
+        return np.zeros(len(query), dtype=bool)
+    return keys[np.minimum(np.searchsorted(keys, query), len(keys) - 1)] == query
+
+
+def _round_up(value):
+    # Two significant digits, rounded up so the rounded threshold still fits
+    scale = 10 ** (math.floor(math.log10(value)) - 1)
+    return min(math.ceil(value / scale - 1e-9) * scale, 1.0)
+
+
+def plan_mining(transactions, min_support=0.05, max_len=None, engine='auto', time_budget=DEFAULT_TIME_BUDGET,
+                memory_budget=None):
+    """Pick the min_support, max_len and engine to mine `transactions` with, within the budgets.
+
+    The requested parameters are kept when their estimate fits: half the free memory
+    and the time budget give or take TIME_TOLERANCE. An 'auto' engine that
+    would pick apriori gets fpgrowth instead when apriori's candidate arrays don't fit.
+    Otherwise max_len is capped first (down to MIN_GUARDED_MAX_LEN), since long
+    itemsets are the most numerous and the least read; if that isn't enough min_support
+    is raised to about the lowest value that fits, found by binary search over the
+    estimate.
+    """
+    memory_budget = memory_budget or available_memory() // 2
+    estimator = ItemsetEstimator(transactions)
+    # Past this many itemsets the budget is blown whatever their length
+    time_budget *= TIME_TOLERANCE
+    limit = int(min(time_budget / SECONDS_PER_ITEMSET, memory_budget / BYTES_PER_ITEMSET)) + 1
+
+    def estimate(support, length):
+        return estimator.estimate(support, length, limit)
+
+    def fits(result):
+        peak = result.bytes + (result.apriori_bytes if chosen == 'apriori' else 0)
+        return result.seconds <= time_budget and peak <= memory_budget
+
+    def plan(support, length, result, ok=True):
+        return MiningPlan(support, length, chosen, min_support, max_len, result, ok)
+
+    result = estimate(min_support, max_len)
+    chosen = choose_engine(transactions.matrix) if engine == 'auto' else engine
+    if engine == 'auto' and chosen == 'apriori' and result.bytes + result.apriori_bytes > memory_budget:
+        chosen = 'fpgrowth'
+    if fits(result):
+        return plan(min_support, max_len, result)
+
+    # Only caps below the longest itemsets expected actually cut anything
+    longest = len(result.itemsets_by_len)
+    if max_len is not None:
+        longest = min(longest, max_len)
+    for length in range(longest - 1, MIN_GUARDED_MAX_LEN - 1, -1):
+        result = estimate(min_support, length)
+        if fits(result):
+            return plan(min_support, length, result)
+    length = MIN_GUARDED_MAX_LEN if longest > MIN_GUARDED_MAX_LEN else max_len
+
+    if not fits(estimate(1.0, length)):
+        return plan(1.0, length, estimate(1.0, length), False)
+    low, high = math.log(min_support), 0.0
+    for _ in range(SEARCH_STEPS):
+        middle = (low + high) / 2
+        if fits(estimate(math.exp(middle), length)):
+            high = middle
+        else:
+            low = middle
+    support = _round_up(math.exp(high))
+    return plan(support, length, estimate(support, length))
+
+
+def describe_plan(plan):
+    """Chat message explaining how the mining parameters were changed, or None if they weren't."""
+    if not plan.adjusted:
+        return None
+    lines = [
+        "### Mining guardrail",
+        f"At min support {plan.requested_support} your data would produce too many itemsets to mine "
+        f"within the time and memory budget, so {_changes(plan)}.",
+        f"Expected now: about {sum(plan.estimate.itemsets_by_len):,} itemsets and at most "
+        f"{plan.estimate.rule_candidates:,} candidate rules.",
+    ]
+    if not plan.fits:
+        lines.append("Even the highest threshold may not fit, so this can take a while.")
+    return "\n".join(lines)
+
+
+def plan_note(plan):
+    """One line for the end of the report saying what the plan changed, or None if nothing."""
+    if not plan.adjusted:
+        return None
+    return f"Note: to fit the time and memory budget, {_changes(plan)}."
+
+
+def _changes(plan):
+    changes = []
+    if plan.max_len != plan.requested_max_len:
+        changes.append(f"itemsets are limited to {plan.max_len} items")
+    if plan.min_support != plan.requested_support:
+        changes.append(f"min support was raised from {plan.requested_support} to {plan.min_support}")
+    return " and ".join(changes)
@@ -0,0 +1,208 @@
+import hashlib
+import io
+import os
+import pickle
+import time
+from collections import defaultdict
+from itertools import combinations
+
+import pandas as pd
+
+from .encoding import count_itemsets, encode_transactions
+from .metrics import get_logger
+from .formats import LONG, sniff_format
+from .mining import MiningResult, association_rules, mine
+
+# Bump when the pickled state changes shape; older states are ignored and re-mined
+STATE_VERSION = 2
+
+logger = get_logger(__name__)
+
+
+def file_fingerprint(path, prefix_size=None, block_size=1 << 20):
+    """(size, sha256 of the whole file, sha256 of its first `prefix_size` bytes, header line, ends with newline)."""
+    full = hashlib.sha256()
+    prefix = hashlib.sha256() if prefix_size is not None else None
+    read = 0
+    last = b''
+    with open(path, 'rb') as f:
+        header = f.readline()
+        f.seek(0)
+        for block in iter(lambda: f.read(block_size), b''):
+            if prefix is not None and read < prefix_size:
+                prefix.update(block[:prefix_size - read])
+            full.update(block)
+            read += len(block)
+            last = block[-1:]
+    return read, full.hexdigest(), prefix.hexdigest() if prefix else None, header, last == b'\n'
+
+
+def negative_border(frequent, items, max_len=None):
+    """Infrequent itemsets whose every proper subset is frequent.
+
+    `frequent` is a set of frozensets; every item that isn't frequent on its own is on
+    the border, the rest are candidates from joining frequent itemsets (apriori-gen).
+    """
+    border = {frozenset([item]) for item in items if frozenset([item]) not in frequent}
+
+    by_size = defaultdict(list)
+    for itemset in frequent:
+        by_size[len(itemset)].append(tuple(sorted(itemset)))
+
+    for size, level in by_size.items():
+        if max_len is not None and size >= max_len:
+            continue
+        by_prefix = defaultdict(list)
+        for itemset in level:
+            by_prefix[itemset[:-1]].append(itemset[-1])
+        for prefix, lasts in by_prefix.items():
+            for a, b in combinations(sorted(lasts), 2):
+                candidate = frozenset(prefix + (a, b))
+                if candidate in frequent:
+                    continue
+                if all(candidate - {item} in frequent for item in candidate):
+                    border.add(candidate)
+    return border
+
+
+class IncrementalMiner:
+    """Re-mines a chat's upload only when it isn't yesterday's file with rows appended.
+
+    After a full mine the support counts of the frequent itemsets and of their negative
+    border are kept on disk with a fingerprint of the file. When the next upload starts
+    with exactly the same bytes, only the appended transactions are parsed and counted.
+    The updated frequent itemsets are exact as long as no border itemset (and no item
+    seen for the first time) becomes frequent; if one does, the data is mined again from
+    scratch. Long `transaction_id,item` files are always mined in full, since appended
+    rows can extend a transaction from the old part of the file.
+
+    A `plan(transactions, min_support, max_len, engine)` callable may change the
+    parameters of a full mine (see guardrails.plan_mining); the state remembers what
+    was asked for, so the next upload with the same request is still updated
+    incrementally.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def mine(self, name, path, load, min_support=0.05, metric="confidence", min_threshold=0.7, engine='auto',
+             max_len=None, plan=None, **_):
+        """Mine the CSV at `path`, updating the saved state of `name` when possible.
+
+        Returns (min_support, max_len, MiningResult), with the thresholds actually mined
+        with: the plan's for a full mine, the saved state's for an update.
+        `load(path, fmt)` returns the file's TransactionMatrix for a full mine. Other
+        keyword arguments (per-upload parameters that don't affect mining) are ignored.
+        """
+        requested = (min_support, max_len)
+        state = self._load_state(name)
+        if state and state['requested'] == requested:
+            result = self._update(name, state, path, metric, min_threshold)
+            if result is not None:
+                return state['min_support'], state['max_len'], result
+
+        fmt = sniff_format(pd.read_csv(path, nrows=10000))
+        transactions = load(path, fmt)
+        if plan is not None:
+            min_support, max_len, engine = plan(transactions, min_support, max_len, engine)
+        result = mine(transactions.to_frame(), min_support=min_support, metric=metric,
+                      min_threshold=min_threshold, engine=engine, max_len=max_len)
+        if fmt.kind != LONG:
+            self._record(name, path, fmt, transactions, result, min_support, max_len, requested)
+        return min_support, max_len, result
+
+    def _update(self, name, state, path, metric, min_threshold):
+        start_time = time.time()
+        if not state['ends_with_newline']:
+            return None
+        size, full_hash, prefix_hash, _, ends_with_newline = file_fingerprint(path, state['size'])
+        if size < state['size'] or prefix_hash != state['sha256']:
+            return None
+
+        with open(path, 'rb') as f:
+            f.seek(state['size'])
+            tail = f.read()
+        n_transactions = state['n_transactions']
+        counts = dict(state['counts'])
+        new_items = set()
+        if tail.strip():
+            delta = encode_transactions(pd.read_csv(io.BytesIO(state['header'] + tail)), state['fmt'])
+            new_items = {item for item in delta.items if item not in state['items']}
+            for item in new_items:
+                counts[frozenset([item])] = 0
+            itemsets = list(counts)
+            for itemset, count in zip(itemsets, count_itemsets(delta, itemsets)):
+                counts[itemset] += int(count)
+            n_transactions += delta.n_transactions
+
+        frequent = {itemset for itemset, count in counts.items() if count / n_transactions >= state['min_support']}
+        if not frequent <= state['frequent']:
+            logger.info("Incremental update of %s: the negative border was crossed, mining again", name)
+            return None
+
+        border = {
+            itemset for itemset in counts
+            if itemset not in frequent and all(itemset - {item} in frequent for item in itemset if len(itemset) > 1)
+        }
+        state.update(
+            size=size, sha256=full_hash, ends_with_newline=ends_with_newline, n_transactions=n_transactions,
+            items=state['items'] | new_items, frequent=frequent,
+            counts={itemset: counts[itemset] for itemset in frequent | border},
+        )
+        self._save_state(name, state)
+
+        itemsets = pd.DataFrame({
+            'support': [counts[itemset] / n_transactions for itemset in frequent],
+            'itemsets': list(frequent),
+        })
+        itemsets = itemsets.sort_values(['support'], ascending=False, kind='stable').reset_index(drop=True)
+        seconds = time.time() - start_time
+
+        start_time = time.time()
+        rules = association_rules(itemsets, metric=metric, min_threshold=min_threshold)
+        return MiningResult('incremental', itemsets, rules, seconds, time.time() - start_time)
+
+    def _record(self, name, path, fmt, transactions, result, min_support, max_len, requested):
+        n_transactions = transactions.n_transactions
+        frequent = set(result.itemsets['itemsets'])
+        counts = {
+            itemset: int(round(support * n_transactions))
+            for itemset, support in zip(result.itemsets['itemsets'], result.itemsets['support'])
+        }
+        border = list(negative_border(frequent, transactions.items, max_len))
+        counts.update(zip(border, (int(count) for count in count_itemsets(transactions, border))))
+
+        size, full_hash, _, header, ends_with_newline = file_fingerprint(path)
+        self._save_state(name, {
+            'version': STATE_VERSION,
+            'size': size,
+            'sha256': full_hash,
+            'header': header,
+            'ends_with_newline': ends_with_newline,
+            'fmt': fmt,
+            'requested': requested,
+            'min_support': min_support,
+            'max_len': max_len,
+            'n_transactions': n_transactions,
+            'items': set(transactions.items),
+            'frequent': frequent,
+            'counts': counts,
+        })
+
+    def _state_path(self, name):
+        return os.path.join(self.directory, f'{name}.pkl')
+
+    def _load_state(self, name):
+        try:
+            with open(self._state_path(name), 'rb') as f:
+                state = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        return state if state.get('version') == STATE_VERSION else None
+
+    def _save_state(self, name, state):
+        path = self._state_path(name)
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
@@ -0,0 +1,183 @@
+import itertools
+import shutil
+import tempfile
+import threading
+import time
+from collections import deque
+
+from .metrics import Trace, get_logger, peak_rss_bytes
+
+logger = get_logger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at its depth limit."""
+
+
+class JobFailed(Exception):
+    """Raised by a handler for a job that failed after it logged and reported the error itself."""
+
+
+class Job:
+    """A single upload to analyse: which chat sent which file, with which parameters."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, chat_id, file_id, params=None, key=None, file_unique_id=None):
+        self.id = next(Job._ids)
+        self.chat_id = chat_id
+        self.file_id = file_id
+        # Stable across re-sends of the same file, unlike file_id
+        self.file_unique_id = file_unique_id
+        self.params = dict(params or {})
+        self.key = key if key is not None else (chat_id, file_unique_id or file_id)
+        self.state = 'queued'
+        self.error = None
+        self.enqueued_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.trace = Trace()
+        self._workdir = None
+
+    @property
+    def workdir(self):
+        """Scratch directory for this job's files, created on first use and removed when the job ends.
+
+        Per job, so concurrent uploads never write to the same file names.
+        """
+        if self._workdir is None:
+            self._workdir = tempfile.mkdtemp(prefix=f'basketbuddy-job-{self.id}-')
+        return self._workdir
+
+    def remove_workdir(self):
+        if self._workdir is not None:
+            shutil.rmtree(self._workdir, ignore_errors=True)
+            self._workdir = None
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "chat_id": self.chat_id,
+            "file_id": self.file_id,
+            "file_unique_id": self.file_unique_id,
+            "params": self.params,
+            "state": self.state,
+            "error": self.error,
+            "enqueued_at": self.enqueued_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "trace": self.trace.to_dict(),
+        }
+
+
+class JobQueue:
+    """Runs uploads on a pool of local worker threads so the webhook can return at once.
+
+    `handler(job)` is called on a worker thread for every job. The queue refuses new
+    jobs once `max_depth` jobs are waiting, and never runs more than `per_chat_limit`
+    jobs for the same chat at the same time. Submitting a job whose key is already
+    queued or running (Telegram retrying the webhook) returns the existing job.
+    Every finished job is recorded in `metrics` (a metrics.Metrics) when one is given.
+    """
+
+    def __init__(self, handler, workers=2, max_depth=20, per_chat_limit=1, history=50, metrics=None):
+        self.handler = handler
+        self.metrics = metrics
+        self.workers = workers
+        self.max_depth = max_depth
+        self.per_chat_limit = per_chat_limit
+        self._pending = deque()
+        self._running = {}
+        self._finished = deque(maxlen=history)
+        self._running_per_chat = {}
+        self._cond = threading.Condition()
+        self._threads = []
+
+    def start(self):
+        # Workers are started on first use so importing a script never spawns threads
+        with self._cond:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, chat_id, file_id, params=None, key=None, file_unique_id=None):
+        job = Job(chat_id, file_id, params, key, file_unique_id)
+        with self._cond:
+            for existing in itertools.chain(self._pending, self._running.values()):
+                if existing.key == job.key:
+                    return existing
+            if len(self._pending) >= self.max_depth:
+                raise QueueFullError(f"Job queue is full ({self.max_depth} jobs waiting).")
+            self._pending.append(job)
+            self._update_gauges()
+            self._cond.notify()
+        self.start()
+        return job
+
+    def status(self):
+        with self._cond:
+            return {
+                "workers": self.workers,
+                "max_depth": self.max_depth,
+                "per_chat_limit": self.per_chat_limit,
+                "queued": [job.to_dict() for job in self._pending],
+                "running": [job.to_dict() for job in self._running.values()],
+                "finished": [job.to_dict() for job in self._finished],
+            }
+
+    def _next_job(self):
+        # First waiting job whose chat is still under its concurrency cap
+        for job in self._pending:
+            if self._running_per_chat.get(job.chat_id, 0) < self.per_chat_limit:
+                self._pending.remove(job)
+                return job
+        return None
+
+    def _work(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None:
+                    self._cond.wait()
+                    job = self._next_job()
+                job.state = 'running'
+                job.started_at = time.time()
+                self._running[job.id] = job
+                self._running_per_chat[job.chat_id] = self._running_per_chat.get(job.chat_id, 0) + 1
+                self._update_gauges()
+
+            try:
+                self.handler(job)
+                job.state = 'done'
+            except JobFailed as e:
+                job.state = 'failed'
+                job.error = str(e)
+            except Exception as e:
+                job.state = 'failed'
+                job.error = str(e)
+                logger.exception("Job %s for chat %s failed", job.id, job.chat_id)
+            finally:
+                job.remove_workdir()
+            job.trace.memory['peak_rss_bytes'] = peak_rss_bytes()
+
+            with self._cond:
+                job.finished_at = time.time()
+                del self._running[job.id]
+                self._running_per_chat[job.chat_id] -= 1
+                if not self._running_per_chat[job.chat_id]:
+                    del self._running_per_chat[job.chat_id]
+                self._finished.append(job)
+                self._update_gauges()
+                if self.metrics is not None:
+                    self.metrics.record_job(job)
+                # A slot for this chat opened up, let every idle worker look again
+                self._cond.notify_all()
+
+    def _update_gauges(self):
+        # Called with the lock held
+        if self.metrics is not None:
+            self.metrics.set('jobs_queued', len(self._pending))
+            self.metrics.set('jobs_running', len(self._running))
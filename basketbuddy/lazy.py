@@ -0,0 +1,74 @@
+import importlib
+import multiprocessing
+import os
+import sys
+import time
+
+# Plotting and mining libraries, about 1.5 s of imports together. Modules reach them
+# through lazy_import and lazy_callable, so a bot answering /start never loads them
+HEAVY_MODULES = [
+    'mlxtend.frequent_patterns',
+    'matplotlib.figure',
+    'matplotlib.backends.backend_agg',
+    'networkx',
+    'plotly.graph_objects',
+    'plotly.express',
+]
+# Set to 1 to import HEAVY_MODULES when a script is loaded, e.g. in a pre-forking server's
+# master process (gunicorn --preload), so every worker starts with them in memory
+PRELOAD = os.environ.get('BASKETBUDDY_PRELOAD', '0') == '1'
+
+
+class LazyModule:
+    """Stands in for a module and imports it on the first attribute access."""
+
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+
+    def __getattr__(self, attribute):
+        return getattr(importlib.import_module(self._name), attribute)
+
+    def __repr__(self):
+        loaded = 'loaded' if self._name in sys.modules else 'not loaded'
+        return f"<lazy module {self._name!r} ({loaded})>"
+
+
+def lazy_import(name):
+    """`import name` deferred to first use: `nx = lazy_import('networkx')`."""
+    return LazyModule(name)
+
+
+def lazy_callable(module, name):
+    """`from module import name` for a function or class, imported on the first call."""
+    def call(*args, **kwargs):
+        return getattr(importlib.import_module(module), name)(*args, **kwargs)
+    call.__name__ = call.__qualname__ = name
+    return call
+
+
+def warm_up(modules=HEAVY_MODULES):
+    """Import `modules` now. Returns {module: seconds} of those that weren't loaded yet."""
+    seconds = {}
+    for name in modules:
+        if name in sys.modules:
+            continue
+        start = time.perf_counter()
+        importlib.import_module(name)
+        seconds[name] = time.perf_counter() - start
+    return seconds
+
+
+def worker_context():
+    """multiprocessing context for the render and mining pools.
+
+    The pools are started from job threads, and forking a process with other threads
+    running can leave a child stuck on a lock one of them held. A forkserver forks
+    from its own single-threaded process, which imports HEAVY_MODULES once so every
+    worker starts with them; spawn where there is no forkserver (Windows).
+    """
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('spawn')
+    context = multiprocessing.get_context('forkserver')
+    # '__main__' is the default preload: workers unpickle the script's functions from it
+    context.set_forkserver_preload(['__main__'] + HEAVY_MODULES)
+    return context
@@ -0,0 +1,126 @@
+import os
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from .encoding import TransactionMatrix, encode_transactions
+from .formats import LONG, sniff_format
+
+# Rough cost of one parsed CSV cell in a pandas chunk (object value plus bookkeeping)
+BYTES_PER_CELL = 64
+MIN_CHUNK_ROWS = 1000
+MAX_CHUNK_ROWS = 1000000
+
+
+def available_memory():
+    """Free physical memory in bytes, or 1 GiB when the platform can't tell us."""
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        return 1 << 30
+
+
+def adaptive_chunksize(n_columns, memory_budget=None):
+    """Rows per chunk so one parsed chunk stays within the memory budget.
+
+    Without an explicit budget an eighth of the free memory is used, leaving room for
+    the encoded matrix and the miner.
+    """
+    budget = memory_budget or available_memory() // 8
+    rows = budget // (max(n_columns, 1) * BYTES_PER_CELL)
+    return int(min(max(rows, MIN_CHUNK_ROWS), MAX_CHUNK_ROWS))
+
+
+def read_chunks(source, chunksize=None, memory_budget=None, **read_csv_kwargs):
+    """pd.read_csv in chunks sized for the memory budget (see adaptive_chunksize)."""
+    if chunksize is None:
+        start = source.tell() if hasattr(source, 'seek') else None
+        header = pd.read_csv(source, nrows=0, **read_csv_kwargs)
+        chunksize = adaptive_chunksize(len(header.columns), memory_budget)
+        if start is not None:
+            source.seek(start)
+    return pd.read_csv(source, chunksize=chunksize, **read_csv_kwargs)
+
+
+def iter_transaction_chunks(source, chunksize=None, memory_budget=None, fmt=None, **read_csv_kwargs):
+    """Yield (DataFormat, TransactionMatrix) for each chunk of a transaction CSV.
+
+    Every chunk holds whole transactions: in long `transaction_id,item` files the rows
+    of the chunk's last transaction are held back and joined to the next chunk, so
+    those files need each transaction's rows next to each other.
+    """
+    held_back = None
+    for chunk in read_chunks(source, chunksize, memory_budget, **read_csv_kwargs):
+        fmt = fmt or sniff_format(chunk)
+        if fmt.kind == LONG:
+            if held_back is not None:
+                chunk = pd.concat([held_back, chunk])
+            last = chunk[fmt.transaction_col].to_numpy() == chunk[fmt.transaction_col].iloc[-1]
+            chunk, held_back = chunk[~last], chunk[last]
+            if chunk.empty:
+                continue
+        yield fmt, encode_transactions(chunk, fmt)
+    if held_back is not None and not held_back.empty:
+        yield fmt, encode_transactions(held_back, fmt)
+
+
+def load_transactions(source, chunksize=None, memory_budget=None, fmt=None, **read_csv_kwargs):
+    """Stream a transaction CSV into a TransactionMatrix in time linear in the file size.
+
+    Each chunk is encoded on its own and only its (row, item id) coordinates are kept;
+    the sparse matrix is assembled once at the end instead of concatenating DataFrames
+    chunk after chunk. Items that first show up in a later chunk simply extend the
+    vocabulary. The layout is sniffed on the first chunk unless `fmt` is given.
+    """
+    vocabulary = pd.Index([])
+    row_parts, col_parts, tid_parts = [], [], []
+    n_rows = 0
+
+    for chunk in read_chunks(source, chunksize, memory_budget, **read_csv_kwargs):
+        fmt = fmt or sniff_format(chunk)
+        encoded = encode_transactions(chunk, fmt)
+
+        # Map this chunk's local item ids onto the global vocabulary, growing it as needed
+        ids = vocabulary.get_indexer(encoded.items)
+        new_items = ids == -1
+        if new_items.any():
+            ids[new_items] = np.arange(len(vocabulary), len(vocabulary) + new_items.sum())
+            vocabulary = vocabulary.append(encoded.items[new_items])
+
+        coo = encoded.matrix.tocoo()
+        col_parts.append(ids[coo.col].astype(np.int32))
+        if fmt.kind == LONG:
+            # A transaction can span chunk boundaries, so keep its id and number rows at the end
+            tid_parts.append(np.asarray(encoded.transaction_ids)[coo.row])
+        else:
+            row_parts.append(coo.row.astype(np.int64) + n_rows)
+            n_rows += encoded.n_transactions
+
+    if fmt is None:
+        raise ValueError("Empty CSV file.")
+
+    cols = np.concatenate(col_parts)
+    if fmt.kind == LONG:
+        rows, transaction_ids = pd.factorize(np.concatenate(tid_parts))
+        transaction_ids = np.asarray(transaction_ids)
+        n_rows = len(transaction_ids)
+    else:
+        rows = np.concatenate(row_parts)
+        transaction_ids = None
+
+    if not fmt.is_one_hot:
+        # Same sorted vocabulary as encoding the whole file in one go
+        order = np.argsort(vocabulary.to_numpy(dtype=str), kind='stable')
+        remap = np.empty(len(order), dtype=np.int32)
+        remap[order] = np.arange(len(order), dtype=np.int32)
+        cols = remap[cols]
+        vocabulary = vocabulary[order]
+
+    matrix = sp.csr_matrix(
+        (np.ones(len(rows), dtype=bool), (rows, cols)),
+        shape=(n_rows, len(vocabulary)),
+    )
+    matrix.sum_duplicates()
+    matrix.data[:] = True
+    return TransactionMatrix(matrix, vocabulary, transaction_ids)
@@ -0,0 +1,161 @@
+import logging
+import os
+import random
+import resource
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+METRIC_PREFIX = 'basketbuddy'
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# Histogram buckets in seconds, from a small upload's encode to a large file's mining
+SECONDS_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# Level for every BasketBuddy logger, and the share of payload (DEBUG) logs actually written
+LOG_LEVEL = os.environ.get('BASKETBUDDY_LOG_LEVEL', 'INFO').upper()
+LOG_SAMPLE_RATE = float(os.environ.get('BASKETBUDDY_LOG_SAMPLE_RATE', '0.01'))
+LOG_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+
+
+def get_logger(name):
+    """A logger at LOG_LEVEL; the first call sets up the stderr handler."""
+    if not logging.getLogger().handlers:
+        logging.basicConfig(level=LOG_LEVEL, format=LOG_FORMAT)
+    return logging.getLogger(name)
+
+
+def log_sampled(logger, level, msg, *args, rate=None):
+    """Log only when `level` is enabled, and then only for a `rate` share of calls.
+
+    For request payloads and DataFrame previews: `args` are formatted lazily, so a
+    skipped call costs a level check and a random number.
+    """
+    rate = LOG_SAMPLE_RATE if rate is None else rate
+    if logger.isEnabledFor(level) and random.random() < rate:
+        logger.log(level, msg, *args)
+
+
+def peak_rss_bytes():
+    """High-water mark of this process's resident memory."""
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class Trace:
+    """Stage timings, counts and memory figures of one job, kept on the Job and shown by /status.
+
+    The pipeline times each stage into `stages` (stage -> seconds) and records the
+    stage that raised, if any, as `failed_stage`.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.counts = {}
+        self.memory = {}
+        self.failed_stage = None
+
+    def add(self, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def count(self, **counts):
+        for name, value in counts.items():
+            self.counts[name] = self.counts.get(name, 0) + value
+
+    def to_dict(self):
+        return {"stages": dict(self.stages), "counts": dict(self.counts), "memory": dict(self.memory),
+                "failed_stage": self.failed_stage}
+
+
+class Metrics:
+    """Counters, gauges and histograms rendered in the Prometheus text format for /metrics.
+
+    Names get METRIC_PREFIX; labels are keyword arguments. Every method takes the lock,
+    workers record jobs while the web thread renders.
+    """
+
+    def __init__(self, prefix=METRIC_PREFIX, buckets=SECONDS_BUCKETS):
+        self.prefix = prefix
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._types = {}
+        self._values = defaultdict(int)
+        self._histograms = {}
+
+    def _key(self, kind, name, labels):
+        name = f'{self.prefix}_{name}'
+        self._types.setdefault(name, kind)
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        with self._lock:
+            self._values[self._key('counter', name, labels)] += value
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._values[self._key('gauge', name, labels)] = value
+
+    def observe(self, name, value, **labels):
+        with self._lock:
+            key = self._key('histogram', name, labels)
+            histogram = self._histograms.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram[0][i] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def record_job(self, job):
+        """Fold a finished job and its trace into the totals."""
+        self.inc('jobs_total', state=job.state)
+        if job.trace.failed_stage is not None:
+            self.inc('stage_failures_total', stage=job.trace.failed_stage)
+        if job.started_at is not None:
+            self.observe('queue_wait_seconds', job.started_at - job.enqueued_at)
+            self.observe('job_seconds', job.finished_at - job.started_at)
+        for stage, seconds in job.trace.stages.items():
+            self.observe('stage_seconds', seconds, stage=stage)
+        for name, value in job.trace.counts.items():
+            self.inc(f'{name}_total', value)
+        for name, value in job.trace.memory.items():
+            self.set(f'last_job_{name}', value)
+
+    def render(self):
+        self.set('process_peak_rss_bytes', peak_rss_bytes())
+        with self._lock:
+            series = defaultdict(list)
+            for (name, labels), value in sorted(self._values.items()):
+                series[name].append(f'{name}{_labels(labels)} {_number(value)}')
+            for (name, labels), (counts, total, count) in sorted(self._histograms.items()):
+                for bound, bucket in zip(self.buckets, counts):
+                    series[name].append(f'{name}_bucket{_labels(labels + (("le", _number(bound)),))} {bucket}')
+                series[name].append(f'{name}_bucket{_labels(labels + (("le", "+Inf"),))} {count}')
+                series[name].append(f'{name}_sum{_labels(labels)} {_number(total)}')
+                series[name].append(f'{name}_count{_labels(labels)} {count}')
+
+            lines = []
+            for name in sorted(series):
+                lines.append(f'# TYPE {name} {self._types[name]}')
+                lines.extend(series[name])
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
@@ -0,0 +1,146 @@
+import os
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .cooccurrence import Cooccurrence
+from .lazy import lazy_callable
+from .parallel_fpgrowth import parallel_fpgrowth
+
+apriori = lazy_callable('mlxtend.frequent_patterns', 'apriori')
+association_rules = lazy_callable('mlxtend.frequent_patterns', 'association_rules')
+fpgrowth = lazy_callable('mlxtend.frequent_patterns', 'fpgrowth')
+
+ENGINES = {
+    'apriori': apriori,
+    'fpgrowth': fpgrowth,
+    'parallel_fpgrowth': parallel_fpgrowth,
+}
+
+ENGINE_LABELS = {
+    'apriori': 'Apriori',
+    'fpgrowth': 'FP-Growth',
+    'parallel_fpgrowth': 'Parallel FP-Growth',
+    # Not an itemset miner: items and pairs straight from the co-occurrence counts
+    'cooccurrence': 'Co-occurrence (pairs)',
+    # Not engines: an earlier run's counts updated with appended transactions, and the
+    # two-pass out-of-core miner in streaming.py
+    'incremental': 'Incremental',
+    'streaming': 'Streaming (SON)',
+}
+
+# Below this many matrix cells apriori's vectorized candidate counting beats building an FP-tree
+APRIORI_MAX_CELLS = 1000000
+# From this many cells the per-item partitions keep a process pool busy enough to pay off
+PARALLEL_MIN_CELLS = 50000000
+
+MiningResult = namedtuple('MiningResult', ['engine', 'itemsets', 'rules', 'seconds', 'rules_seconds'])
+MiningResult.__new__.__defaults__ = (None,)
+
+
+def choose_engine(df):
+    """Pick the engine for a one-hot DataFrame: apriori for small matrices, fpgrowth otherwise,
+    spread over every core for the largest ones."""
+    cells = df.shape[0] * df.shape[1]
+    if cells <= APRIORI_MAX_CELLS:
+        return 'apriori'
+    if cells >= PARALLEL_MIN_CELLS and (os.cpu_count() or 1) > 1:
+        return 'parallel_fpgrowth'
+    return 'fpgrowth'
+
+
+def frequent_itemsets(df, min_support=0.05, engine='auto', max_len=None, pairs=None):
+    """Frequent itemsets of a one-hot DataFrame, seeded by its co-occurrence counts.
+
+    Items and pairs are counted exactly by one sparse product (cooccurrence.py), which
+    is all the 'cooccurrence' engine, and 'auto' with max_len <= 2, needs. Otherwise
+    only the columns of items in some frequent pair go to `engine`: no other item can
+    be in a longer frequent itemset, and their single-item itemsets are added back
+    from the counts. `pairs` is the Cooccurrence of `df` if already computed.
+
+    Returns the engine that ran and the itemsets.
+    """
+    pairs = pairs or Cooccurrence(df)
+    if engine == 'auto' and max_len is not None and max_len <= 2:
+        engine = 'cooccurrence'
+    if engine == 'cooccurrence':
+        return engine, pairs.itemsets(min_support, max_len)
+
+    if engine != 'auto' and engine not in ENGINES:
+        raise ValueError(f"Unknown mining engine: {engine}")
+    seed = pairs.seed(min_support)
+    if max_len == 1 or not seed.any():
+        # Nothing longer than one item is frequent
+        return (engine if engine != 'auto' else 'cooccurrence'), pairs.itemsets(min_support, max_len=1)
+
+    seeded = df.iloc[:, np.flatnonzero(seed)]
+    if engine == 'auto':
+        engine = choose_engine(seeded)
+    itemsets = ENGINES[engine](seeded, min_support=min_support, use_colnames=True, max_len=max_len)
+    alone = np.flatnonzero((pairs.item_supports >= min_support) & ~seed)
+    singles = pd.DataFrame({'support': pairs.item_supports[alone], 'itemsets': [frozenset([item]) for item in pairs.items[alone]]})
+    return engine, pd.concat([itemsets, singles], ignore_index=True)
+
+
+def mine(df, min_support=0.05, metric="confidence", min_threshold=0.7, engine='auto', max_len=None):
+    """Mine frequent itemsets and association rules with a single engine.
+
+    `engine` is a key of ENGINES, 'cooccurrence' (single-item -> single-item rules
+    only) or 'auto'. `seconds` on the result covers the itemset mining only,
+    association_rules costs the same whichever engine found the itemsets and is timed
+    separately in `rules_seconds`.
+    """
+    start_time = time.time()
+    pairs = Cooccurrence(df)
+    engine, itemsets = frequent_itemsets(df, min_support=min_support, engine=engine, max_len=max_len, pairs=pairs)
+    seconds = time.time() - start_time
+
+    start_time = time.time()
+    rules = derive_rules(itemsets, engine, pairs, min_support, metric=metric, min_threshold=min_threshold)
+    return MiningResult(engine, itemsets, rules, seconds, time.time() - start_time)
+
+
+def derive_rules(itemsets, engine, pairs, min_support, metric="confidence", min_threshold=0.7):
+    """Association rules of itemsets mined by `engine` at `min_support` from data whose Cooccurrence is `pairs`."""
+    if engine == 'cooccurrence':
+        # Rules of itemsets of at most two items are exactly the pair rules
+        return pairs.rules(min_support, metric=metric, min_threshold=min_threshold)
+    return association_rules(itemsets, metric=metric, min_threshold=min_threshold)
+
+
+SweepResult = namedtuple('SweepResult', ['threshold', 'itemsets', 'rules', 'timings'])
+
+
+def sweep(df, thresholds, metric="confidence", min_threshold=0.7, engine='auto', retime=False,
+          engines=('apriori', 'fpgrowth'), base=None, max_len=None):
+    """Frequent itemsets and rules for several min_support thresholds from one mining run.
+
+    The data is mined once at the lowest threshold. Every higher threshold's itemsets and
+    rules are a subset of that result with support >= threshold, and their supports,
+    confidences and lifts are unchanged, so they are filtered rather than mined again.
+    With `retime` each engine in `engines` is still run at every threshold, only to fill
+    `timings` (engine -> seconds) for runtime comparisons. A `base` result mined
+    elsewhere at the lowest threshold (e.g. streamed from disk) is used as is.
+
+    Returns the base MiningResult and one SweepResult per threshold, lowest first.
+    """
+    thresholds = sorted(thresholds)
+    if base is None:
+        base = mine(df, min_support=thresholds[0], metric=metric, min_threshold=min_threshold, engine=engine, max_len=max_len)
+
+    results = []
+    for threshold in thresholds:
+        itemsets = base.itemsets[base.itemsets['support'] >= threshold].reset_index(drop=True)
+        rules = base.rules[base.rules['support'] >= threshold].reset_index(drop=True)
+
+        timings = {}
+        if retime:
+            for name in engines:
+                start_time = time.time()
+                ENGINES[name](df, min_support=threshold, use_colnames=True, max_len=max_len)
+                timings[name] = time.time() - start_time
+
+        results.append(SweepResult(threshold, itemsets, rules, timings))
+    return base, results
@@ -0,0 +1,180 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+# Bump when the on-disk layout changes; load() refuses models written by another layout
+MODEL_FORMAT_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+VOCAB_FILE = 'vocab.json'
+CURRENT_FILE = 'CURRENT'
+SET_COLUMNS = ('antecedents', 'consequents')
+
+
+def _json_item(item):
+    # numpy scalars from the loader's vocabulary aren't JSON serializable
+    return item.item() if isinstance(item, np.generic) else item
+
+
+def _encode_sets(sets, ids):
+    """Flatten a column of frozensets into (offsets, item ids), CSR style."""
+    lengths = np.fromiter((len(items) for items in sets), dtype=np.int64, count=len(sets))
+    offsets = np.zeros(len(sets) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    flat = np.fromiter(
+        (i for items in sets for i in sorted(ids[item] for item in items)),
+        dtype=np.int32, count=int(offsets[-1]),
+    )
+    return offsets, flat
+
+
+def _decode_sets(offsets, flat, names):
+    return [frozenset(names[flat[start:end]]) for start, end in zip(offsets[:-1], offsets[1:])]
+
+
+class Model:
+    """A stored set of frequent itemsets and rules, with its arrays memory-mapped by default.
+
+    Itemsets, antecedents and consequents are item ids into `vocab`, laid out CSR
+    style as an offsets array and a flat ids array. Every numeric column is its own
+    .npy file, so reading one metric only touches that file.
+    """
+
+    def __init__(self, path, manifest, vocab, arrays):
+        self.path = path
+        self.manifest = manifest
+        self.vocab = vocab
+        self.arrays = arrays
+
+    @property
+    def version(self):
+        return self.manifest['version']
+
+    def itemsets(self):
+        """The frequent itemsets as mlxtend returns them: support and a frozenset of item names."""
+        names = np.asarray(self.vocab, dtype=object)
+        return pd.DataFrame({
+            'support': np.asarray(self.arrays['itemset_support']),
+            'itemsets': _decode_sets(self.arrays['itemset_offsets'], self.arrays['itemset_items'], names),
+        })
+
+    def rules(self):
+        """The association rules as association_rules returns them."""
+        names = np.asarray(self.vocab, dtype=object)
+        columns = {
+            column: _decode_sets(self.arrays[f'{column}_offsets'], self.arrays[f'{column}_items'], names)
+            for column in SET_COLUMNS
+        }
+        for i, column in enumerate(self.manifest['rule_metrics']):
+            columns[column] = np.asarray(self.arrays[f'rule_metric_{i}'])
+        return pd.DataFrame(columns)
+
+
+class ModelStore:
+    """Versioned on-disk store of mined models, one directory per model name.
+
+    Each save writes a new version directory (vocab.json, the .npy arrays and a
+    manifest) next to the old ones and then moves the name's CURRENT pointer to it,
+    so a reader never sees a half-written model. Only the newest `keep_versions`
+    versions are kept.
+    """
+
+    def __init__(self, directory, keep_versions=3):
+        self.directory = directory
+        self.keep_versions = keep_versions
+        os.makedirs(directory, exist_ok=True)
+
+    def names(self):
+        return sorted(
+            item.name for item in os.scandir(self.directory)
+            if item.is_dir() and os.path.exists(os.path.join(item.path, CURRENT_FILE))
+        )
+
+    def versions(self, name):
+        model_dir = os.path.join(self.directory, name)
+        if not os.path.isdir(model_dir):
+            return []
+        return sorted(int(item.name[1:]) for item in os.scandir(model_dir) if item.is_dir() and item.name[:1] == 'v' and item.name[1:].isdigit())
+
+    def current_version(self, name):
+        try:
+            with open(os.path.join(self.directory, name, CURRENT_FILE)) as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    def save(self, name, itemsets, rules, params=None):
+        """Store a mining result as the new current version of `name` and return its number."""
+        model_dir = os.path.join(self.directory, name)
+        os.makedirs(model_dir, exist_ok=True)
+
+        vocab = sorted({item for items in itemsets['itemsets'] for item in items}, key=str)
+        ids = {item: i for i, item in enumerate(vocab)}
+        metrics = [column for column in rules.columns if column not in SET_COLUMNS]
+
+        arrays = {'itemset_support': itemsets['support'].to_numpy(dtype=np.float64)}
+        arrays['itemset_offsets'], arrays['itemset_items'] = _encode_sets(itemsets['itemsets'], ids)
+        for column in SET_COLUMNS:
+            arrays[f'{column}_offsets'], arrays[f'{column}_items'] = _encode_sets(rules[column], ids)
+        for i, column in enumerate(metrics):
+            arrays[f'rule_metric_{i}'] = rules[column].to_numpy(dtype=np.float64)
+
+        staging = tempfile.mkdtemp(dir=model_dir, prefix='.staging-')
+        try:
+            for key, array in arrays.items():
+                np.save(os.path.join(staging, f'{key}.npy'), array)
+            with open(os.path.join(staging, VOCAB_FILE), 'w') as f:
+                json.dump([_json_item(item) for item in vocab], f)
+
+            version = max(self.versions(name), default=0) + 1
+            manifest = {
+                "format_version": MODEL_FORMAT_VERSION,
+                "name": name,
+                "version": version,
+                "created_at": time.time(),
+                "params": params or {},
+                "n_items": len(vocab),
+                "n_itemsets": len(itemsets),
+                "n_rules": len(rules),
+                "rule_metrics": metrics,
+                "arrays": sorted(arrays),
+            }
+            with open(os.path.join(staging, MANIFEST_FILE), 'w') as f:
+                json.dump(manifest, f, indent=2, default=str)
+
+            os.replace(staging, os.path.join(model_dir, f'v{version:06d}'))
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        # Repoint CURRENT atomically, then drop the oldest versions
+        pointer = os.path.join(model_dir, f'.{CURRENT_FILE}.tmp')
+        with open(pointer, 'w') as f:
+            f.write(str(version))
+        os.replace(pointer, os.path.join(model_dir, CURRENT_FILE))
+        for old in self.versions(name)[:-self.keep_versions]:
+            shutil.rmtree(os.path.join(model_dir, f'v{old:06d}'), ignore_errors=True)
+        return version
+
+    def load(self, name, version=None, mmap=True):
+        """Open a stored model (the current version by default) without copying its arrays."""
+        version = version or self.current_version(name)
+        if version is None:
+            raise ValueError(f"No stored model named {name!r}")
+        path = os.path.join(self.directory, name, f'v{version:06d}')
+        with open(os.path.join(path, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+        if manifest.get('format_version') != MODEL_FORMAT_VERSION:
+            raise ValueError(f"Model {name!r} v{version} has format {manifest.get('format_version')}, expected {MODEL_FORMAT_VERSION}")
+        with open(os.path.join(path, VOCAB_FILE)) as f:
+            vocab = json.load(f)
+
+        arrays = {
+            key: np.load(os.path.join(path, f'{key}.npy'), mmap_mode='r' if mmap else None)
+            for key in manifest['arrays']
+        }
+        return Model(path, manifest, vocab, arrays)
@@ -0,0 +1,126 @@
+import functools
+import math
+import os
+
+import numpy as np
+
+from .lazy import lazy_import
+from .ranking import itemset_labels, top_rules
+
+nx = lazy_import('networkx')
+go = lazy_import('plotly.graph_objects')
+
+# Rules drawn in the static PNG; past this the picture is a hairball
+PNG_MAX_EDGES = 50
+# Rules kept in the interactive HTML and GraphML exports of larger rule sets
+INTERACTIVE_MAX_EDGES = 1000
+# Components up to this many nodes get a force-directed layout, O(n^2) per iteration;
+# larger ones the spectral layout, one sparse eigendecomposition
+SPRING_MAX_NODES = 300
+# Distance between the centres of neighbouring components in the packed layout; each
+# component is laid out in a square of side 2
+COMPONENT_SPACING = 3.0
+LAYOUT_CACHE_SIZE = 256
+
+
+def rule_graph(rules, max_edges=PNG_MAX_EDGES, metric='lift'):
+    """Directed graph of the `max_edges` best rules by `metric`, antecedent -> consequent.
+
+    Nodes are itemset labels ("Bread, Milk"); edges carry the rule's lift, confidence
+    and support. Uses the rules already mined, nothing is recomputed.
+    """
+    shown = top_rules(rules, max_edges, metric)
+    graph = nx.DiGraph()
+    edges = zip(itemset_labels(shown['antecedents']), itemset_labels(shown['consequents']),
+                shown['lift'], shown['confidence'], shown['support'])
+    for antecedent, consequent, lift, confidence, support in edges:
+        graph.add_edge(antecedent, consequent, lift=float(lift), confidence=float(confidence), support=float(support))
+    return graph
+
+
+def layout_graph(graph):
+    """{node: (x, y)} for a rule graph, cached by its edges, so a re-sent result isn't laid out again."""
+    return dict(_layout(tuple(sorted(graph.edges()))))
+
+
+@functools.lru_cache(maxsize=LAYOUT_CACHE_SIZE)
+def _layout(edges):
+    # Each connected component is laid out on its own (a spectral layout of a
+    # disconnected graph collapses), and the components are packed in a grid, largest first
+    graph = nx.Graph(edges)
+    components = sorted(nx.connected_components(graph), key=lambda nodes: (-len(nodes), min(nodes)))
+    columns = max(math.ceil(math.sqrt(len(components))), 1)
+    positions = []
+    for i, nodes in enumerate(components):
+        component = graph.subgraph(sorted(nodes))
+        if len(nodes) <= SPRING_MAX_NODES:
+            local = nx.spring_layout(component, seed=0)
+        else:
+            local = nx.spectral_layout(component)
+        centre = np.array([i % columns, -(i // columns)]) * COMPONENT_SPACING
+        positions.extend((node, tuple(float(v) for v in centre + xy)) for node, xy in local.items())
+    return tuple(positions)
+
+
+def network_chart(graph, positions, title='Association Rule Network'):
+    """Chart spec of a rule graph for rendering.Renderer."""
+    index = {node: i for i, node in enumerate(graph.nodes())}
+    return {
+        "kind": "network",
+        "title": title,
+        "nodes": [[str(node), positions[node][0], positions[node][1]] for node in graph.nodes()],
+        "edges": [[index[a], index[b], data['lift']] for a, b, data in graph.edges(data=True)],
+    }
+
+
+def write_html(graph, positions, path, title='Association Rule Network'):
+    """Interactive plotly page of a rule graph: zoom and pan, hover a node or an edge midpoint for details."""
+    edge_x, edge_y, mid_x, mid_y, mid_text = [], [], [], [], []
+    for a, b, data in graph.edges(data=True):
+        (xa, ya), (xb, yb) = positions[a], positions[b]
+        edge_x += [xa, xb, None]
+        edge_y += [ya, yb, None]
+        mid_x.append((xa + xb) / 2)
+        mid_y.append((ya + yb) / 2)
+        mid_text.append(f"{a} -> {b}<br>lift {data['lift']:.2f}, confidence {data['confidence']:.2f}, "
+                        f"support {data['support']:.3f}")
+    nodes = list(graph.nodes())
+    degrees = np.array([graph.degree(node) for node in nodes], dtype=float)
+    fig = go.Figure([
+        go.Scatter(x=edge_x, y=edge_y, mode='lines', line={'width': 0.6, 'color': '#999'}, hoverinfo='skip'),
+        go.Scatter(x=mid_x, y=mid_y, mode='markers', marker={'size': 4, 'color': '#999'}, text=mid_text, hoverinfo='text'),
+        go.Scatter(x=[positions[node][0] for node in nodes], y=[positions[node][1] for node in nodes], mode='markers',
+                   marker={'size': 8 + 4 * np.sqrt(degrees), 'color': 'lightblue', 'line': {'width': 1, 'color': '#369'}},
+                   text=[f"{node}<br>{graph.in_degree(node)} rules in, {graph.out_degree(node)} out" for node in nodes],
+                   hoverinfo='text'),
+    ])
+    fig.update_layout(title=title, showlegend=False, hovermode='closest',
+                      xaxis={'visible': False}, yaxis={'visible': False})
+    # The page loads plotly.js from its CDN, which keeps the file small enough to send
+    fig.write_html(path, include_plotlyjs='cdn')
+    return path
+
+
+def export_network(rules, workdir, name, renderer):
+    """Network files for a chat: a PNG of the best rules, plus interactive exports when there are more.
+
+    The PNG shows the top PNG_MAX_EDGES rules by lift. When there are more rules,
+    the top INTERACTIVE_MAX_EDGES also go to `name`.html (plotly) and `name`.graphml
+    (for Gephi, Cytoscape and the like). Returns the paths written.
+    """
+    if not len(rules):
+        return []
+    graph = rule_graph(rules, PNG_MAX_EDGES)
+    title = 'Association Rule Network'
+    if len(rules) > PNG_MAX_EDGES:
+        title += f' (top {PNG_MAX_EDGES} rules by lift)'
+    paths = [renderer.render(network_chart(graph, layout_graph(graph), title), os.path.join(workdir, f'{name}.png'))]
+
+    if len(rules) > PNG_MAX_EDGES:
+        graph = rule_graph(rules, INTERACTIVE_MAX_EDGES)
+        title = f'Association Rule Network (top {graph.number_of_edges()} of {len(rules)} rules by lift)'
+        paths.append(write_html(graph, layout_graph(graph), os.path.join(workdir, f'{name}.html'), title))
+        graphml_path = os.path.join(workdir, f'{name}.graphml')
+        nx.write_graphml(graph, graphml_path)
+        paths.append(graphml_path)
+    return [path for path in paths if path]
@@ -0,0 +1,151 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from .lazy import lazy_callable, worker_context
+
+fpgrowth = lazy_callable('mlxtend.frequent_patterns', 'fpgrowth')
+
+# Below this many nonzeros the pool costs more than it saves and everything runs in-process
+PARALLEL_MIN_NONZEROS = 200000
+
+# Set in each worker by _init_worker: the shared transaction matrix and the mining limits
+_shared = {}
+
+
+def _as_csr(df):
+    if hasattr(df, 'sparse'):
+        return df.sparse.to_coo().tocsr().astype(bool)
+    return sp.csr_matrix(df.to_numpy() != 0)
+
+
+def min_count_for(min_support, n_transactions):
+    """Smallest transaction count whose support count / n passes `min_support`, as mlxtend compares it."""
+    count = max(math.ceil(min_support * n_transactions), 1)
+    while count > 1 and (count - 1) / n_transactions >= min_support:
+        count -= 1
+    while count / n_transactions < min_support:
+        count += 1
+    return count
+
+
+def _share(array):
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+    return block, (block.name, array.shape, array.dtype.str)
+
+
+def _attach(spec, blocks):
+    name, shape, dtype = spec
+    # Pool workers share the parent's resource tracker, which unlinks the segment only once
+    block = shared_memory.SharedMemory(name=name)
+    blocks.append(block)
+    return np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+
+
+def _init_worker(specs, shape, order, min_count, max_len):
+    blocks = []
+    arrays = {key: _attach(spec, blocks) for key, spec in specs.items()}
+    _set_shared(arrays, shape, order, min_count, max_len)
+    _shared['blocks'] = blocks
+
+
+def _set_shared(arrays, shape, order, min_count, max_len):
+    data_csr = np.ones(len(arrays['csr_indices']), dtype=bool)
+    _shared['csr'] = sp.csr_matrix((data_csr, arrays['csr_indices'], arrays['csr_indptr']), shape=shape)
+    _shared['csc_indices'] = arrays['csc_indices']
+    _shared['csc_indptr'] = arrays['csc_indptr']
+    _shared['order'] = order
+    _shared['rank'] = {item: rank for rank, item in enumerate(order)}
+    _shared['min_count'] = min_count
+    _shared['max_len'] = max_len
+
+
+def _mine_partition(item):
+    """Frequent itemsets whose least frequent item is `item`, as (item ids, count) pairs.
+
+    The conditional database is every transaction holding `item`, cut down to the
+    items more frequent than it; each itemset has exactly one least frequent item, so
+    the partitions never overlap and together cover everything.
+    """
+    indptr, indices = _shared['csc_indptr'], _shared['csc_indices']
+    rows = indices[indptr[item]:indptr[item + 1]]
+    found = [((item,), len(rows))]
+    max_len = _shared['max_len']
+    higher = _shared['order'][:_shared['rank'][item]]
+    if max_len == 1 or not len(higher):
+        return found
+
+    conditional = _shared['csr'][rows][:, higher]
+    counts = np.asarray(conditional.sum(axis=0)).ravel()
+    keep = counts >= _shared['min_count']
+    if not keep.any():
+        return found
+
+    # Most frequent first, the order an FP-tree is built in
+    columns = np.argsort(-counts[keep], kind='stable')
+    items = higher[keep][columns]
+    frame = pd.DataFrame.sparse.from_spmatrix(conditional[:, np.flatnonzero(keep)[columns]].astype(bool))
+    # Integer counts pass the halved margin exactly when they reach min_count
+    itemsets = fpgrowth(frame, min_support=(_shared['min_count'] - 0.5) / len(rows),
+                        max_len=max_len - 1 if max_len else None)
+    for support, itemset in zip(itemsets['support'], itemsets['itemsets']):
+        found.append((tuple(items[list(itemset)]) + (item,), int(round(support * len(rows)))))
+    return found
+
+
+def parallel_fpgrowth(df, min_support=0.5, use_colnames=False, max_len=None, workers=None):
+    """FP-Growth split into one conditional database per frequent item (PFP style).
+
+    Drop-in for mlxtend's fpgrowth: same arguments and the same itemsets and supports,
+    in a different row order. The partitions are mined in a process pool whose workers
+    read the transactions from shared memory instead of each getting a pickled copy.
+    """
+    matrix = _as_csr(df)
+    n_transactions = matrix.shape[0]
+    if not n_transactions:
+        return pd.DataFrame({'support': [], 'itemsets': []})
+
+    min_count = min_count_for(min_support, n_transactions)
+    supports = np.asarray(matrix.sum(axis=0)).ravel()
+    frequent = np.flatnonzero(supports >= min_count)
+    order = frequent[np.argsort(-supports[frequent], kind='stable')]
+
+    csc = matrix.tocsc()
+    arrays = {
+        'csr_indptr': matrix.indptr, 'csr_indices': matrix.indices,
+        'csc_indptr': csc.indptr, 'csc_indices': csc.indices,
+    }
+    workers = workers or os.cpu_count() or 1
+    # Biggest conditional databases (rows x more frequent items) first, so no worker is
+    # left with a large one at the end
+    partitions = [item for rank, item in sorted(enumerate(order), key=lambda pair: -supports[pair[1]] * pair[0])]
+
+    if workers == 1 or matrix.nnz < PARALLEL_MIN_NONZEROS or len(order) < 2:
+        _set_shared(arrays, matrix.shape, order, min_count, max_len)
+        results = [_mine_partition(item) for item in partitions]
+    else:
+        blocks, specs = [], {}
+        try:
+            for key, array in arrays.items():
+                block, specs[key] = _share(array)
+                blocks.append(block)
+            with ProcessPoolExecutor(max_workers=workers, mp_context=worker_context(), initializer=_init_worker,
+                                     initargs=(specs, matrix.shape, order, min_count, max_len)) as pool:
+                results = list(pool.map(_mine_partition, partitions))
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+    itemsets = [itemset for found in results for itemset in found]
+    columns = df.columns.to_numpy()
+    return pd.DataFrame({
+        'support': [count / n_transactions for _, count in itemsets],
+        'itemsets': [frozenset(columns[list(ids)] if use_colnames else map(int, ids)) for ids, _ in itemsets],
+    })
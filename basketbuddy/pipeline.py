@@ -0,0 +1,188 @@
+"""The analysis of one upload as a fixed sequence of stages, each made of swappable steps.
+
+    fetch -> sniff -> encode -> mine -> rules -> rank -> render -> deliver
+
+A config (presets.make_config) names the steps of every stage, by their REGISTRY name
+or as "module:function" for a step defined outside the package. A step is a function of
+the run's Context (stages.py); a stage given a list of names runs them in order. Every
+stage is timed into the run's Trace, so /metrics and the CLI report the same stages.
+"""
+import contextlib
+import importlib
+import os
+import threading
+
+from . import stages
+from .incremental import IncrementalMiner
+from .metrics import Trace
+from .model_store import ModelStore
+from .recommender import IndexRegistry
+from .rendering import Renderer
+from .suggestions import StubBackend, SuggestionCache, SuggestionService
+from .telegram_client import TelegramClient
+
+STAGES = ('fetch', 'sniff', 'encode', 'mine', 'rules', 'rank', 'render', 'deliver')
+# A failure in these is the upload's fault and reported as such
+READ_STAGES = ('fetch', 'sniff', 'encode')
+
+REGISTRY = {
+    'fetch': {'telegram': stages.fetch_telegram, 'local': stages.fetch_local},
+    'sniff': {'auto': stages.sniff_auto},
+    'encode': {'frame': stages.encode_frame, 'chunked': stages.encode_chunked, 'deferred': stages.encode_deferred},
+    'mine': {'single': stages.mine_single, 'incremental': stages.mine_incremental, 'sweep': stages.mine_sweep},
+    'rules': {'association_rules': stages.rules_association},
+    'rank': {
+        'tables': stages.rank_tables,
+        'analysis': stages.rank_analysis,
+        'customer_insights': stages.rank_customer_insights,
+        'saved_notice': stages.rank_saved_notice,
+        'engine_summary': stages.rank_engine_summary,
+        'sweep': stages.rank_sweep,
+    },
+    'render': {
+        'tables': stages.render_tables,
+        'insights_csv': stages.render_insights_csv,
+        'support_chart': stages.render_support_chart,
+        'report': stages.render_report,
+        'sweep_chart': stages.render_sweep_chart,
+        'network': stages.render_network,
+    },
+    'deliver': {
+        'telegram': stages.deliver_telegram,
+        'recommender': stages.deliver_recommender,
+        'suggestions': stages.deliver_suggestions,
+        'suggestions_with_tip': stages.deliver_suggestions_with_tip,
+        'local': stages.deliver_local,
+    },
+}
+
+
+class PipelineError(Exception):
+    """A step failed; `stage` is where, `error` the exception it raised."""
+
+    def __init__(self, stage, error):
+        super().__init__(f"{stage}: {error}")
+        self.stage = stage
+        self.error = error
+
+
+def step_names(config, stage):
+    """Names of the steps configured for `stage`, as a list."""
+    names = config['stages'].get(stage) or []
+    return [names] if isinstance(names, str) else list(names)
+
+
+def resolve_step(stage, name):
+    """The step function called `name` in REGISTRY[stage], or imported from "module:function"."""
+    if ':' in name:
+        module, function = name.split(':', 1)
+        return getattr(importlib.import_module(module), function)
+    try:
+        return REGISTRY[stage][name]
+    except KeyError:
+        raise ValueError(f"Unknown {stage} step {name!r}, expected one of {', '.join(REGISTRY[stage])}") from None
+
+
+class Context:
+    """State of one run: the upload and its parameters in, then what each stage adds."""
+
+    def __init__(self, source, chat_id, params, pipeline, trace=None, workdir=None, notify=None, output_dir=None):
+        self.source = source  # Telegram file_id, or a local path
+        self.chat_id = chat_id
+        self.params = dict(params)  # Steps may adjust them (guardrails), the job's copy stays as queued
+        self.pipeline = pipeline
+        self.trace = trace or Trace()
+        self.workdir = workdir
+        self.notify = notify or (lambda text: None)  # Progress messages (guardrails, preview)
+        self.output_dir = output_dir
+        self.path = None
+        self.fmt = None
+        self.transactions = None
+        self.pairs = None
+        self.min_support = params.get('min_support')
+        self.runs = []  # MiningResults; rules is None until the rules stage
+        self.sweep = None
+        self.report = None
+        self.files = []
+        self.model = None  # (itemsets, rules, params) the recommender stores and indexes
+        self.cached = False  # report, files and model came from a result cache
+        self.notes = []  # Lines appended to the report once ranked (guardrail changes)
+
+
+class Pipeline:
+    """A config's steps and the components they share across runs (clients, caches, stores).
+
+    The components are created on first use, so a bot or CLI run only starts what its
+    steps need.
+    """
+
+    def __init__(self, config, metrics=None):
+        self.config = config
+        self.metrics = metrics
+        self.root = os.getcwd()
+        self.steps = {stage: [resolve_step(stage, name) for name in step_names(config, stage)] for stage in STAGES}
+        self.rule_indexes = IndexRegistry()
+        self._components = {}
+        # Reentrant, the suggester is built on the telegram component
+        self._lock = threading.RLock()
+
+    def run(self, ctx, stages=STAGES, lookup=None):
+        """Run `stages` in order on `ctx`. A failing step raises PipelineError.
+
+        `lookup(ctx)` is called once the file is fetched; when it fills in a cached
+        result (ctx.cached) the run skips to the deliver stage.
+        """
+        stages = list(stages)
+        with contextlib.ExitStack() as stack:
+            while stages:
+                stage = stages.pop(0)
+                with ctx.trace.stage(stage):
+                    for step in self.steps[stage]:
+                        try:
+                            result = step(ctx)
+                            if stage == 'fetch':
+                                # The file stays until the run ends
+                                ctx.path = stack.enter_context(result)
+                        except Exception as e:
+                            ctx.trace.failed_stage = stage
+                            raise PipelineError(stage, e) from e
+                if stage == 'rank' and ctx.notes and ctx.report:
+                    ctx.report = "\n\n".join([ctx.report, *ctx.notes])
+                if stage == 'fetch' and lookup is not None:
+                    lookup(ctx)
+                    if ctx.cached:
+                        stages = [stage for stage in stages if stage == 'deliver']
+        return ctx
+
+    def _component(self, name, factory):
+        with self._lock:
+            if name not in self._components:
+                self._components[name] = factory()
+            return self._components[name]
+
+    @property
+    def telegram(self):
+        # One pooled, retrying client for every Bot API call
+        return self._component('telegram', lambda: TelegramClient(self.config['bot_token']))
+
+    @property
+    def renderer(self):
+        return self._component('renderer', lambda: Renderer(os.path.join(self.root, 'result_cache', 'charts')))
+
+    @property
+    def incremental(self):
+        return self._component('incremental', lambda: IncrementalMiner(os.path.join(self.root, 'incremental', self.config['name'])))
+
+    @property
+    def model_store(self):
+        return self._component('model_store', lambda: ModelStore(os.path.join(self.root, 'models', self.config['name'])))
+
+    @property
+    def suggester(self):
+        return self._component('suggester', self._make_suggester)
+
+    def _make_suggester(self):
+        # 'stub' answers with a fixed text, for a bot with no model behind it yet; None is the Ollama default
+        backend = StubBackend() if self.config['suggestion_backend'] == 'stub' else None
+        cache = SuggestionCache(os.path.join(self.root, 'result_cache', 'suggestions')) if self.config['suggestion_cache'] else None
+        return SuggestionService(self.telegram, backend=backend, cache=cache, parse_mode=self.config['parse_mode'], metrics=self.metrics)
@@ -0,0 +1,129 @@
+"""Configs of the bots: DEFAULTS, and one preset per script1.py .. script6.py on top of them.
+
+A config is a plain dict, so a JSON file of overrides (cli.py --config) has the same
+shape. 'stages' maps every pipeline stage to a step name or a list of them.
+"""
+import copy
+
+PREPROCESS_HELP = (
+    "To preprocess your data for analysis, please ensure your CSV is formatted correctly.\n\n"
+    "### Expected Format:\n"
+    "Each row should represent a transaction, and each column should represent an item.\n"
+    "\n### Example:\n"
+    "```\n"
+    "Bread,Butter,Milk,Eggs,Cheese\n"
+    "1,1,0,1,0\n"
+    "1,0,1,1,0\n"
+    "0,1,1,0,1\n"
+    "1,1,1,0,1\n"
+    "0,0,1,1,0\n"
+    "```\n"
+    "### Preprocessing Notes:\n"
+    "- The data should be in a one-hot encoded format (1 for presence, 0 for absence).\n"
+    "- Ensure that the first row contains the item names as headers.\n"
+    "- There should be no missing values in the CSV.\n"
+    "- Baskets listed as item names per row, or as `transaction_id,item` pairs, are converted automatically.\n"
+    "- You can send the CSV after following these guidelines."
+)
+
+DEFAULTS = {
+    # Names the bot's result cache, incremental state and model directories
+    "name": "basketbuddy",
+    # Replace this with your actual Telegram Bot Token
+    "bot_token": "YOUR_BOT_TOKEN",
+    "stages": {
+        "fetch": "telegram",
+        "sniff": "auto",
+        "encode": "frame",
+        "mine": "single",
+        "rules": "association_rules",
+        "rank": "tables",
+        "render": [],
+        "deliver": "telegram",
+    },
+    # Mining parameters attached to every queued upload
+    "params": {"min_support": 0.05, "metric": "confidence", "min_threshold": 0.7, "engine": "auto", "rank_by": "lift",
+               "top_k": 10, "benchmark": False},
+    # Upload captions and the parameters they override, e.g. "/benchmark" times every engine
+    "captions": {},
+    # Replies to text commands (lower-cased), and to any other message
+    "commands": {"/start": "Welcome! Please upload your transactional data in CSV format."},
+    "fallback": "Please upload a CSV file with your transactional data.",
+    "parse_mode": "Markdown",
+    # Budget mining by the plan of guardrails.py, and send a sampled preview while mining
+    "guardrails": False,
+    "preview": False,
+    # None for the Ollama model (suggestions.py), "stub" for a fixed reply
+    "suggestion_backend": None,
+    "suggestion_cache": False,
+    # Job queue
+    "workers": 2,
+    "max_depth": 20,
+    "per_chat_limit": 1,
+}
+
+PRESETS = {
+    "script1": {
+        "stages": {"rank": "tables"},
+        "params": {"engine": "apriori"},
+    },
+    "script2": {
+        "stages": {"rank": "analysis", "render": ["support_chart", "report"]},
+        "captions": {"/benchmark": {"benchmark": True}},
+    },
+    "script3": {
+        "stages": {"rank": "customer_insights", "render": "tables"},
+        "captions": {"/benchmark": {"benchmark": True}},
+    },
+    "script4": {
+        "stages": {"rank": "saved_notice", "render": ["tables", "insights_csv"], "deliver": ["telegram", "suggestions_with_tip"]},
+        "params": {"engine": "apriori"},
+        "commands": {"/start": "Welcome! Please upload your CSV data."},
+        "fallback": "Please upload a CSV file.",
+        "suggestion_cache": True,
+    },
+    "script5": {
+        "stages": {"encode": "deferred", "mine": "incremental", "rank": "engine_summary", "render": ["tables", "insights_csv"],
+                   "deliver": ["telegram", "recommender", "suggestions"]},
+        # "/quick" mines single-item -> single-item rules from the co-occurrence counts only
+        "captions": {"/benchmark": {"benchmark": True}, "/quick": {"engine": "cooccurrence", "max_len": 2}},
+        "commands": {"/start": "Welcome! Please upload your CSV data.", "/preprocess": PREPROCESS_HELP},
+        "fallback": "Please upload a CSV file or type /help for assistance.",
+        "guardrails": True,
+        "preview": True,
+        "suggestion_cache": True,
+    },
+    "script6": {
+        "stages": {"encode": "chunked", "mine": "sweep", "rank": "sweep", "render": ["tables", "sweep_chart", "network"],
+                   "deliver": ["telegram", "recommender", "suggestions"]},
+        "params": {"min_support_thresholds": [0.01, 0.05, 0.1, 0.15, 0.2], "retime": False},
+        # "/benchmark" re-times every engine at each threshold
+        "captions": {"/benchmark": {"retime": True}},
+        "commands": {"/start": "Welcome! Please upload your CSV data.", "/preprocess": PREPROCESS_HELP},
+        "fallback": "Please upload a CSV file or type /help for assistance.",
+        "parse_mode": None,
+        "guardrails": True,
+        "suggestion_backend": "stub",
+    },
+}
+
+
+def merge(config, overrides):
+    """`config` updated with `overrides`; nested dicts are merged one key at a time."""
+    merged = copy.deepcopy(config)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+
+def make_config(preset=None, overrides=None):
+    """DEFAULTS with the named preset and then `overrides` applied."""
+    config = copy.deepcopy(DEFAULTS)
+    if preset is not None:
+        if preset not in PRESETS:
+            raise ValueError(f"Unknown preset {preset!r}, expected one of {', '.join(PRESETS)}")
+        config = merge(dict(config, name=preset), PRESETS[preset])
+    return merge(config, overrides or {})
@@ -0,0 +1,110 @@
+import math
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .encoding import TransactionMatrix
+from .guardrails import plan_mining
+from .mining import apriori, association_rules
+from .ranking import DEFAULT_RANK_METRIC, itemset_labels, top_rules
+
+# With this many sampled transactions each itemset's estimated support is within
+# PREVIEW_EPSILON of its true one with probability 1 - PREVIEW_DELTA (Hoeffding, per
+# itemset; not for all of them at once)
+PREVIEW_EPSILON = 0.01
+PREVIEW_DELTA = 0.05
+# Longer itemsets rarely make the top of a preview and cost the most to mine
+PREVIEW_MAX_LEN = 3
+# z for the 95% intervals shown next to each estimate
+PREVIEW_Z = 1.96
+# Samples up to this many cells are mined as a dense matrix, where apriori is fastest
+PREVIEW_DENSE_CELLS = 20000000
+# The sample is never mined below this share of min_support; at low thresholds
+# min_support - epsilon would make apriori nearly exhaustive
+PREVIEW_MIN_SUPPORT_RATIO = 0.5
+# Seconds the guardrail estimate may give the preview; past it there is no preview
+PREVIEW_TIME_BUDGET = 5
+
+Preview = namedtuple('Preview', ['itemsets', 'rules', 'sample_size', 'n_transactions', 'seconds'])
+
+
+def hoeffding_sample_size(epsilon=PREVIEW_EPSILON, delta=PREVIEW_DELTA):
+    """Transactions to sample so one itemset's estimated support is within `epsilon` with probability 1 - `delta`."""
+    return math.ceil(math.log(2 / delta) / (2 * epsilon ** 2))
+
+
+def wilson_interval(successes, trials, z=PREVIEW_Z):
+    """Wilson score interval for binomial proportions, elementwise over numpy arrays."""
+    successes = np.asarray(successes, dtype=float)
+    trials = np.maximum(np.asarray(trials, dtype=float), 1)
+    p = successes / trials
+    centre = (p + z * z / (2 * trials)) / (1 + z * z / trials)
+    half = z * np.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / (1 + z * z / trials)
+    return centre - half, centre + half
+
+
+def mine_preview(transactions, min_support=0.05, metric="confidence", min_threshold=0.7, epsilon=PREVIEW_EPSILON,
+                 delta=PREVIEW_DELTA, max_len=PREVIEW_MAX_LEN, random_state=None):
+    """Approximate itemsets and rules from a uniform sample of a TransactionMatrix.
+
+    Returns None when the data is no bigger than the sample, the exact run is just as
+    fast then, and when the guardrail estimate says mining the sample wouldn't fit
+    PREVIEW_TIME_BUDGET. The sample is mined at min_support - epsilon (but not below
+    half of min_support), so each itemset that is frequent in the full data is kept
+    with probability about 1 - delta; itemsets get `support_low`/`support_high` and
+    rules `confidence_low`/`confidence_high` columns with 95% Wilson intervals.
+    """
+    start_time = time.time()
+    sample_size = hoeffding_sample_size(epsilon, delta)
+    if transactions.n_transactions <= sample_size:
+        return None
+
+    rng = np.random.default_rng(random_state)
+    rows = np.sort(rng.choice(transactions.n_transactions, sample_size, replace=False))
+    sample = TransactionMatrix(transactions.matrix[rows], transactions.items)
+
+    threshold = max(min_support - epsilon, min_support * PREVIEW_MIN_SUPPORT_RATIO, 1 / sample_size)
+    plan = plan_mining(sample, threshold, max_len, 'apriori', time_budget=PREVIEW_TIME_BUDGET)
+    if not plan.fits or plan.min_support > threshold:
+        # A preview at a raised threshold would answer a different question; the exact run will
+        return None
+    max_len = plan.max_len
+    if sample_size * sample.n_items <= PREVIEW_DENSE_CELLS:
+        frame = pd.DataFrame(sample.matrix.toarray(), columns=sample.items)
+    else:
+        frame = sample.to_frame()
+    # With max_len capped, apriori's few level-wise passes beat building an FP-tree
+    itemsets = apriori(frame, min_support=threshold, use_colnames=True, max_len=max_len)
+    itemsets['support_low'], itemsets['support_high'] = wilson_interval(itemsets['support'] * sample_size, sample_size)
+    # Keep what could still be frequent in the full data
+    itemsets = itemsets[itemsets['support_high'] >= min_support].reset_index(drop=True)
+
+    rules = association_rules(itemsets[['support', 'itemsets']], metric=metric, min_threshold=min_threshold)
+    antecedent_counts = rules['antecedent support'] * sample_size
+    rules['confidence_low'], rules['confidence_high'] = wilson_interval(rules['support'] * sample_size, antecedent_counts)
+    return Preview(itemsets, rules, sample_size, transactions.n_transactions, time.time() - start_time)
+
+
+def format_preview(preview, k=5, rank_by=DEFAULT_RANK_METRIC):
+    """Chat message for a preview: the top itemsets and rules with their intervals."""
+    lines = [
+        f"### Quick preview (from {preview.sample_size:,} of {preview.n_transactions:,} transactions)",
+        "Supports and confidences are estimates with 95% intervals; the exact results follow.",
+        "",
+        "Top Frequent Itemsets:",
+    ]
+    itemsets = preview.itemsets.nlargest(k, 'support')
+    for label, row in zip(itemset_labels(itemsets['itemsets']), itemsets.itertuples()):
+        lines.append(f"- {label}: support {row.support:.3f} ({row.support_low:.3f}-{row.support_high:.3f})")
+
+    lines += ["", f"Top Rules by {rank_by}:"]
+    rules = top_rules(preview.rules, k, rank_by)
+    antecedents = itemset_labels(rules['antecedents'])
+    consequents = itemset_labels(rules['consequents'])
+    for a, c, row in zip(antecedents, consequents, rules.itertuples()):
+        lines.append(f"- {a} -> {c}: confidence {row.confidence:.2f} ({row.confidence_low:.2f}-{row.confidence_high:.2f})")
+    if not len(rules):
+        lines.append("- No rules found in the sample.")
+    return "\n".join(lines)
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+# association_rules columns rules can be ranked by, higher is better for each
+RANK_METRICS = ('lift', 'confidence', 'leverage', 'support', 'conviction', 'zhangs_metric')
+DEFAULT_RANK_METRIC = 'lift'
+DEFAULT_TOP_K = 10
+
+INSIGHT_TEMPLATE = "If customers buy {antecedents}, they are likely to also buy {consequents} (Confidence: {confidence:.2f}, Support: {support:.2f})."
+
+
+def _scores(rules, metric):
+    if metric not in RANK_METRICS or metric not in rules.columns:
+        raise ValueError(f"Can't rank rules by {metric!r}, use one of: {', '.join(RANK_METRICS)}")
+    # NaN (e.g. undefined conviction) ranks last
+    return np.nan_to_num(rules[metric].to_numpy(dtype=float), nan=-np.inf)
+
+
+def top_rules(rules, k=DEFAULT_TOP_K, metric=DEFAULT_RANK_METRIC):
+    """The `k` best rules by `metric`, best first.
+
+    Only the k winners are sorted: np.argpartition finds them in linear time, so this
+    stays cheap however many rules a low min_support produced.
+    """
+    scores = _scores(rules, metric)
+    if k <= 0 or not len(scores):
+        return rules.iloc[:0]
+    if k < len(scores):
+        best = np.argpartition(-scores, k - 1)[:k]
+    else:
+        best = np.arange(len(scores))
+    best = best[np.argsort(-scores[best], kind='stable')]
+    return rules.iloc[best]
+
+
+def itemset_labels(itemsets):
+    """', '-joined item names for a column of frozensets.
+
+    Each distinct itemset is joined once; rules repeat the same antecedents a lot.
+    """
+    codes, uniques = pd.factorize(itemsets)
+    labels = np.array([', '.join(sorted(map(str, items))) for items in uniques], dtype=object)
+    return pd.Series(labels[codes], index=itemsets.index)
+
+
+def rule_insights(rules, k=DEFAULT_TOP_K, metric=DEFAULT_RANK_METRIC, template=INSIGHT_TEMPLATE):
+    """Insight sentences for the top `k` rules only, best first."""
+    shown = top_rules(rules, k, metric)
+    antecedents = itemset_labels(shown['antecedents'])
+    consequents = itemset_labels(shown['consequents'])
+    return [
+        template.format(antecedents=a, consequents=c, confidence=conf, support=sup)
+        for a, c, conf, sup in zip(antecedents, consequents, shown['confidence'], shown['support'])
+    ]
+
+
+def export_insights(rules, path, metric=DEFAULT_RANK_METRIC):
+    """Write every rule with its insight sentence to a CSV, best first, without a per-row loop."""
+    if len(rules):
+        rules = rules.iloc[np.argsort(-_scores(rules, metric), kind='stable')]
+    antecedents = itemset_labels(rules['antecedents'])
+    consequents = itemset_labels(rules['consequents'])
+    confidence = pd.Series(np.char.mod('%.2f', rules['confidence'].to_numpy(dtype=float)), index=rules.index, dtype=object)
+    support = pd.Series(np.char.mod('%.2f', rules['support'].to_numpy(dtype=float)), index=rules.index, dtype=object)
+
+    insights = pd.DataFrame({
+        "Antecedents": antecedents,
+        "Consequents": consequents,
+        "Confidence": confidence,
+        "Support": support,
+        "Insight": ("If customers buy " + antecedents + ", they are likely to also buy " + consequents
+                    + " (Confidence: " + confidence + ", Support: " + support + ")."),
+    })
+    insights.to_csv(path, index=False)
+    return path
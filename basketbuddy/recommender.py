@@ -0,0 +1,81 @@
+import threading
+from itertools import combinations
+
+DEFAULT_RECOMMEND_METRIC = 'lift'
+# Consequents kept per antecedent; more than a checkout widget ever shows
+MAX_CONSEQUENTS = 20
+# Baskets bigger than this only look up antecedents of up to two items
+MAX_FULL_SUBSET_BASKET = 12
+
+
+class RuleIndex:
+    """Association rules indexed by antecedent for basket lookups.
+
+    Each antecedent itemset (a frozenset of item names) maps to the items its rules
+    recommend, best first by `metric`. A rule with several consequents recommends
+    each of them. Built once per mined dataset; lookups only touch the antecedents
+    that are subsets of the basket.
+    """
+
+    def __init__(self, rules, metric=DEFAULT_RECOMMEND_METRIC, max_consequents=MAX_CONSEQUENTS):
+        self.metric = metric
+        best = {}
+        for antecedents, consequents, score in zip(rules['antecedents'], rules['consequents'], rules[metric]):
+            antecedents = frozenset(str(item) for item in antecedents)
+            scores = best.setdefault(antecedents, {})
+            for item in consequents:
+                item = str(item)
+                if score > scores.get(item, float('-inf')):
+                    scores[item] = float(score)
+
+        self.consequents = {
+            antecedents: tuple(sorted(scores.items(), key=lambda pair: -pair[1])[:max_consequents])
+            for antecedents, scores in best.items()
+        }
+        # Only items that start some rule can be part of a matching antecedent
+        self.antecedent_items = frozenset(item for antecedents in self.consequents for item in antecedents)
+        self.max_antecedent_len = max((len(antecedents) for antecedents in self.consequents), default=0)
+
+    def __len__(self):
+        return len(self.consequents)
+
+    def recommend(self, basket, k=5):
+        """Up to `k` (item, score) pairs for a basket, best first, never an item already in it."""
+        basket = frozenset(str(item) for item in basket)
+        candidates = sorted(basket & self.antecedent_items)
+        max_len = self.max_antecedent_len
+        if len(candidates) > MAX_FULL_SUBSET_BASKET:
+            max_len = min(max_len, 2)
+
+        scores = {}
+        for size in range(1, min(max_len, len(candidates)) + 1):
+            for antecedents in combinations(candidates, size):
+                for item, score in self.consequents.get(frozenset(antecedents), ()):
+                    if item not in basket and score > scores.get(item, float('-inf')):
+                        scores[item] = score
+        return sorted(scores.items(), key=lambda pair: -pair[1])[:k]
+
+
+class IndexRegistry:
+    """The current RuleIndex for each dataset (here: each chat's latest upload).
+
+    Publishing a new index replaces the whole mapping in one assignment, so lookups
+    never take the lock and always see either the old index or the new one. Names are
+    compared as strings, so a chat id sent as 42 or "42" finds the same index.
+    """
+
+    def __init__(self):
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def publish(self, name, index):
+        with self._lock:
+            indexes = dict(self._indexes)
+            indexes[str(name)] = index
+            self._indexes = indexes
+
+    def get(self, name):
+        return self._indexes.get(str(name))
+
+    def names(self):
+        return list(self._indexes)
@@ -0,0 +1,180 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from .lazy import lazy_callable, worker_context
+from .metrics import get_logger
+from .ranking import itemset_labels
+
+# Only the render workers draw, so the parent process never imports matplotlib
+Figure = lazy_callable('matplotlib.figure', 'Figure')
+FigureCanvasAgg = lazy_callable('matplotlib.backends.backend_agg', 'FigureCanvasAgg')
+
+logger = get_logger(__name__)
+
+# Processes drawing charts; matplotlib isn't thread-safe, so the job threads never draw themselves
+RENDER_WORKERS = 2
+# Bars past this many are unreadable and made large results hang the old support graph
+PLOT_TOP_K = 30
+# Network charts label their edges with the lift only up to this many edges
+NETWORK_EDGE_LABELS = 20
+# Part of every cache key: bump it when the drawing code changes how a chart looks
+RENDER_VERSION = 1
+
+
+def itemset_support_chart(panels, top_k=PLOT_TOP_K):
+    """Chart of the `top_k` most frequent itemsets, one bar panel per (title, itemsets DataFrame)."""
+    spec = {"kind": "bars", "xlabel": "Itemsets", "ylabel": "Support", "panels": []}
+    for title, itemsets in panels:
+        shown = itemsets.nlargest(top_k, 'support')
+        spec["panels"].append({
+            "title": title,
+            "labels": list(itemset_labels(shown['itemsets'])),
+            "values": [float(value) for value in shown['support']],
+        })
+    return spec
+
+
+def line_chart(title, xlabel, ylabel, series):
+    """Chart of one marked line per (label, xs, ys) in `series`."""
+    return {
+        "kind": "lines", "title": title, "xlabel": xlabel, "ylabel": ylabel,
+        "series": [[label, [float(x) for x in xs], [float(y) for y in ys]] for label, xs, ys in series],
+    }
+
+
+def chart_key(chart):
+    """sha256 of a chart's spec; equal specs draw equal PNGs."""
+    material = json.dumps({"chart": chart, "version": RENDER_VERSION}, sort_keys=True)
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+def _draw_bars(chart):
+    panels = chart["panels"]
+    fig = Figure(figsize=(7 * len(panels), 6))
+    for ax, panel in zip(fig.subplots(1, len(panels), squeeze=False)[0], panels):
+        ax.bar(range(len(panel["values"])), panel["values"])
+        ax.set_xticks(range(len(panel["labels"])), panel["labels"], rotation=45, ha='right')
+        ax.set_title(panel["title"])
+        ax.set_xlabel(chart["xlabel"])
+        ax.set_ylabel(chart["ylabel"])
+    return fig
+
+
+def _draw_lines(chart):
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    for label, xs, ys in chart["series"]:
+        ax.plot(xs, ys, marker='o', label=label)
+    ax.set_title(chart["title"])
+    ax.set_xlabel(chart["xlabel"])
+    ax.set_ylabel(chart["ylabel"])
+    ax.legend()
+    ax.grid()
+    return fig
+
+
+def _draw_network(chart):
+    # Nodes at the positions given by network.layout_graph; thicker arrows for higher lift
+    nodes, edges = chart["nodes"], chart["edges"]
+    fig = Figure(figsize=(12, 8))
+    ax = fig.subplots()
+    lifts = [lift for _, _, lift in edges]
+    low, high = min(lifts, default=0.0), max(lifts, default=0.0)
+    for a, b, lift in edges:
+        (_, xa, ya), (_, xb, yb) = nodes[a], nodes[b]
+        width = 0.5 + 2.5 * (lift - low) / ((high - low) or 1)
+        ax.annotate('', xy=(xb, yb), xytext=(xa, ya), zorder=1,
+                    arrowprops={'arrowstyle': '-|>', 'color': 'gray', 'lw': width, 'shrinkA': 12, 'shrinkB': 12})
+        if len(edges) <= NETWORK_EDGE_LABELS:
+            ax.text((xa + xb) / 2, (ya + yb) / 2, f"{lift:.2f}", fontsize=7, color='dimgray', ha='center', va='center')
+    ax.scatter([x for _, x, _ in nodes], [y for _, _, y in nodes], s=600, c='lightblue', zorder=2)
+    for label, x, y in nodes:
+        ax.text(x, y, label, fontsize=8, fontweight='bold', ha='center', va='center', zorder=3)
+    ax.set_title(chart["title"])
+    ax.set_axis_off()
+    return fig
+
+
+DRAWERS = {
+    'bars': _draw_bars,
+    'lines': _draw_lines,
+    'network': _draw_network,
+}
+
+
+def draw_chart(chart, path):
+    """Draw a chart spec to a PNG at `path` with the object-oriented Agg API (no pyplot state)."""
+    fig = DRAWERS[chart["kind"]](chart)
+    FigureCanvasAgg(fig)
+    fig.tight_layout()
+    fig.savefig(path)
+    return path
+
+
+class Renderer:
+    """Draws charts in a process pool and caches the PNGs by chart hash.
+
+    `submit(chart, path)` returns a Future of `path`. A chart drawn before, by any job,
+    is copied from `directory` at once; others are drawn by a worker process straight
+    to `path` and then copied into the cache. The oldest PNGs are dropped once there are
+    more than `max_entries`.
+    """
+
+    def __init__(self, directory, workers=RENDER_WORKERS, max_entries=500):
+        self.directory = directory
+        self.workers = workers
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._executor = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _pool(self):
+        # Started on first use so importing a script never starts processes
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=worker_context())
+            return self._executor
+
+    def submit(self, chart, path):
+        cached = os.path.join(self.directory, f"{chart_key(chart)}.png")
+        try:
+            shutil.copyfile(cached, path)
+            os.utime(cached)
+            future = Future()
+            future.set_result(path)
+            return future
+        except OSError:
+            pass
+        future = self._pool().submit(draw_chart, chart, path)
+        future.add_done_callback(lambda done: self._store(done, path, cached))
+        return future
+
+    def render(self, chart, path):
+        """Draw (or fetch) a chart and return `path`, or None if drawing failed."""
+        try:
+            return self.submit(chart, path).result()
+        except Exception:
+            logger.exception("Error rendering %s", os.path.basename(path))
+            return None
+
+    def _store(self, future, path, cached):
+        if future.cancelled() or future.exception() is not None:
+            return
+        staging = f"{cached}.{threading.get_ident()}.tmp"
+        try:
+            shutil.copyfile(path, staging)
+            os.replace(staging, cached)
+        except OSError as e:
+            # The job may already have removed its directory
+            logger.debug("Could not cache %s: %s", path, e)
+            return
+        with self._lock:
+            entries = sorted(
+                (entry.stat().st_mtime, entry.path) for entry in os.scandir(self.directory) if entry.name.endswith('.png')
+            )
+            for _, old in entries[:max(len(entries) - self.max_entries, 0)]:
+                os.remove(old)
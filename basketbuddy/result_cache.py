@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+
+PAYLOAD_FILE = 'payload.pkl'
+# Part of every key: bump it when what the bots store as payload changes, or a class
+# pickled in it moves, so older entries are missed rather than misread
+PAYLOAD_VERSION = 5
+
+
+def content_key(path, block_size=1 << 20):
+    """sha256 of a file's bytes, for uploads that come without a Telegram file_unique_id."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """On-disk cache of analysis results keyed by the uploaded file and the mining parameters.
+
+    Each entry is a directory holding the pickled payload (report text and the like) and
+    copies of the rendered artifacts (CSVs, PNGs). Entries are evicted least recently used
+    first once there are more than `max_entries` of them or they take more than
+    `max_bytes` on disk.
+    """
+
+    def __init__(self, directory, max_entries=200, max_bytes=512 * 1024 * 1024):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, file_key, params):
+        """Cache key for a file (Telegram file_unique_id or content hash) and mining parameters.
+
+        Returns None when there is nothing to identify the file by; get() and put() treat a
+        None key as a miss and a no-op.
+        """
+        if not file_key:
+            return None
+        material = json.dumps({"file": file_key, "params": params, "version": PAYLOAD_VERSION}, sort_keys=True, default=str)
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def get(self, key):
+        """(payload, artifact paths) for a cached result, or None on a miss."""
+        if key is None:
+            return None
+        entry = os.path.join(self.directory, key)
+        try:
+            with open(os.path.join(entry, PAYLOAD_FILE), 'rb') as f:
+                payload, names = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        # Touch the entry so eviction sees it as recently used
+        now = time.time()
+        os.utime(entry, (now, now))
+        return payload, [os.path.join(entry, name) for name in names]
+
+    def put(self, key, payload, artifacts=()):
+        """Store a result and return the cached copies of its artifacts."""
+        if key is None:
+            return list(artifacts)
+        entry = os.path.join(self.directory, key)
+        staging = tempfile.mkdtemp(dir=self.directory, prefix='.staging-')
+        try:
+            names = []
+            for path in artifacts:
+                name = os.path.basename(path)
+                shutil.copyfile(path, os.path.join(staging, name))
+                names.append(name)
+            with open(os.path.join(staging, PAYLOAD_FILE), 'wb') as f:
+                pickle.dump((payload, names), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+            with self._lock:
+                shutil.rmtree(entry, ignore_errors=True)
+                os.replace(staging, entry)
+                self._evict()
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        return [os.path.join(entry, name) for name in names]
+
+    def _evict(self):
+        entries = []
+        for item in os.scandir(self.directory):
+            if item.is_dir() and not item.name.startswith('.'):
+                size = sum(f.stat().st_size for f in os.scandir(item.path) if f.is_file())
+                entries.append((item.stat().st_mtime, size, item.path))
+
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        # The newest entry is the one just written, it always stays
+        while len(entries) > 1 and (len(entries) > self.max_entries or total > self.max_bytes):
+            _, size, path = entries.pop(0)
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
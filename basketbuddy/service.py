@@ -0,0 +1,179 @@
+"""The Telegram bot around a Pipeline: webhook, job queue, result cache and the HTTP endpoints.
+
+    service = BotService(make_config('script5'))
+    service.app.run(port=5004)
+"""
+import functools
+import logging
+import os
+
+from flask import Flask, jsonify, request
+
+from .job_queue import JobFailed, JobQueue, QueueFullError
+from .metrics import PROMETHEUS_CONTENT_TYPE, Metrics, get_logger, log_sampled
+from .pipeline import READ_STAGES, STAGES, Context, Pipeline, PipelineError, step_names
+from .recommender import RuleIndex
+from .result_cache import ResultCache, content_key
+from .telegram_client import TelegramError
+
+logger = get_logger(__name__)
+
+
+class BotService:
+    """One bot: a config's pipeline run on every uploaded CSV, off the webhook thread."""
+
+    def __init__(self, config, import_name=None):
+        self.config = config
+        self.metrics = Metrics()
+        self.pipeline = Pipeline(config, metrics=self.metrics)
+        self.result_cache = ResultCache(os.path.join(self.pipeline.root, 'result_cache', config['name']))
+        self.job_queue = JobQueue(self.handle_upload, workers=config['workers'], max_depth=config['max_depth'],
+                                  per_chat_limit=config['per_chat_limit'], metrics=self.metrics)
+
+        self.app = Flask(import_name or __name__)
+        self.app.add_url_rule('/webhook', 'webhook', self.webhook, methods=['POST'])
+        self.app.add_url_rule('/status', 'status', self.status, methods=['GET'])
+        self.app.add_url_rule('/metrics', 'metrics', self.export_metrics, methods=['GET'])
+        if 'recommender' in step_names(config, 'deliver'):
+            self.app.add_url_rule('/recommend', 'recommend', self.recommend, methods=['POST'])
+            self.app.add_url_rule('/models/reload', 'reload_models', self.reload_models, methods=['POST'])
+            self.load_models()
+
+    def webhook(self):
+        try:
+            # A body that isn't JSON gets the same 400 as one without a message
+            data = request.get_json(silent=True)
+            # Whole updates are only logged at DEBUG, and then only a sample of them
+            log_sampled(logger, logging.DEBUG, "Received data: %s", data)
+
+            if data is None or 'message' not in data:
+                return jsonify({"error": "Invalid request"}), 400
+
+            message = data['message']
+            user_id = message['from']['id']
+            text = message.get('text', '').lower()
+            log_sampled(logger, logging.DEBUG, "User ID: %s, Message: %s", user_id, text)
+
+            if text in self.config['commands']:
+                self.send_message(user_id, self.config['commands'][text])
+                return jsonify({"status": "success"}), 200
+
+            elif 'document' in message:
+                # Queue the analysis so the webhook returns before Telegram times out and retries
+                try:
+                    params = dict(self.config['params'])
+                    # Caption keywords on the upload override parameters, e.g. "/benchmark"
+                    caption = message.get('caption', '')
+                    for keyword, overrides in self.config['captions'].items():
+                        if keyword in caption:
+                            params.update(overrides)
+                    job = self.job_queue.submit(user_id, message['document']['file_id'], params,
+                                                file_unique_id=message['document'].get('file_unique_id'))
+                except QueueFullError:
+                    self.send_message(user_id, "The bot is busy right now. Please send your file again in a few minutes.")
+                    return jsonify({"status": "busy"}), 200
+
+                logger.info("Job %s queued for user %s", job.id, user_id)
+                return jsonify({"status": "queued", "job_id": job.id}), 200
+
+            else:
+                self.send_message(user_id, self.config['fallback'])
+                return jsonify({"status": "success"}), 200
+
+        except Exception as e:
+            logger.exception("Webhook failed")
+            return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+
+    def handle_upload(self, job):
+        ctx = Context(job.file_id, job.chat_id, job.params, self.pipeline, trace=job.trace, workdir=job.workdir,
+                      notify=functools.partial(self.send_message, job.chat_id))
+
+        # The same file with the same parameters was analysed before, answer from the cache.
+        # An upload without a file_unique_id is keyed by its content once downloaded
+        cache_key = self.result_cache.key(job.file_unique_id, job.params)
+
+        def lookup(ctx):
+            nonlocal cache_key
+            if cache_key is None:
+                cache_key = self.result_cache.key(content_key(ctx.path), job.params)
+                self._from_cache(ctx, cache_key)
+
+        try:
+            if self._from_cache(ctx, cache_key):
+                self.pipeline.run(ctx, ('deliver',))
+            else:
+                self.pipeline.run(ctx, STAGES, lookup=lookup)
+        except PipelineError as e:
+            if e.stage in READ_STAGES:
+                logger.warning("Error reading the CSV file of job %s: %s", job.id, e.error)
+                self.send_message(job.chat_id, f"There was an error reading the CSV file: {str(e.error)}")
+            else:
+                logger.error("Data processing failed for chat %s in the %s stage", job.chat_id, e.stage, exc_info=e.error)
+                self.send_message(job.chat_id, f"Error processing data: {str(e.error)}")
+            # Already logged and told to the chat; the queue records the job as failed
+            raise JobFailed(str(e)) from e
+
+        log_sampled(logger, logging.DEBUG, "Analysis results: %s", ctx.report)
+        if not ctx.cached:
+            self.result_cache.put(cache_key, (ctx.report, ctx.model), ctx.files)
+
+    def _from_cache(self, ctx, cache_key):
+        # Fills in a cached result; None keys always miss
+        cached = self.result_cache.get(cache_key)
+        if cached:
+            ctx.trace.count(cache_hits=1)
+            (ctx.report, ctx.model), ctx.files = cached
+            ctx.cached = True
+        return ctx.cached
+
+    def status(self):
+        return jsonify(self.job_queue.status()), 200
+
+    def export_metrics(self):
+        # Prometheus scrape target: per-stage timing histograms, job counts and memory high-water marks
+        return self.metrics.render(), 200, {'Content-Type': PROMETHEUS_CONTENT_TYPE}
+
+    def recommend(self):
+        """Items to suggest for a basket, from the rules mined on a chat's latest upload.
+
+        Expects {"chat_id": ..., "basket": [item, ...], "k": 5}.
+        """
+        data = request.get_json(silent=True)
+        if not data or 'chat_id' not in data or not isinstance(data.get('basket'), list):
+            return jsonify({"error": "Expected JSON with chat_id and a basket list"}), 400
+
+        try:
+            k = int(data.get('k', 5))
+        except (TypeError, ValueError):
+            k = 0
+        if k < 1:
+            return jsonify({"error": "k must be a positive integer"}), 400
+
+        rule_index = self.pipeline.rule_indexes.get(data['chat_id'])
+        if rule_index is None:
+            return jsonify({"error": "No rules have been mined for this chat yet"}), 404
+
+        recommendations = rule_index.recommend(data['basket'], k=k)
+        return jsonify({"recommendations": [{"item": item, rule_index.metric: score} for item, score in recommendations]}), 200
+
+    def load_models(self):
+        """Publish the current stored model of every chat. The arrays are memory-mapped, not parsed."""
+        loaded = 0
+        for name in self.pipeline.model_store.names():
+            try:
+                self.pipeline.rule_indexes.publish(name, RuleIndex(self.pipeline.model_store.load(name).rules()))
+                loaded += 1
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning("Error loading model %s: %s", name, e)
+        return loaded
+
+    def reload_models(self):
+        # Picks up models written by another process (or restored from a backup) without a restart
+        return jsonify({"models": self.load_models()}), 200
+
+    def send_message(self, chat_id, text):
+        log_sampled(logger, logging.DEBUG, "Sending message to chat ID %s: %s", chat_id, text)
+        try:
+            self.pipeline.telegram.send_message(chat_id, text, parse_mode=self.config['parse_mode'])
+        except TelegramError as e:
+            logger.error("Error sending message to chat %s: %s", chat_id, e)
@@ -0,0 +1,420 @@
+"""Implementations of the pipeline stages (see pipeline.py), one function per step.
+
+Every step takes the upload's pipeline.Context and reads or sets its attributes. Fetch
+steps return a context manager yielding the local CSV path, which is kept until the
+run ends.
+"""
+import contextlib
+import functools
+import logging
+import os
+import shutil
+import time
+
+import pandas as pd
+
+from .cooccurrence import Cooccurrence
+from .download import csv_engine_kwargs, fetch_upload, read_csv_local
+from .encoding import encode_transactions
+from .formats import sniff_format
+from .guardrails import describe_plan, plan_mining, plan_note
+from .loader import load_transactions
+from .metrics import get_logger, log_sampled
+from .mining import ENGINE_LABELS, MiningResult, derive_rules, frequent_itemsets, sweep
+from .network import export_network
+from .preview import format_preview, mine_preview
+from .ranking import DEFAULT_RANK_METRIC, DEFAULT_TOP_K, export_insights, rule_insights, top_rules
+from .recommender import RuleIndex
+from .rendering import itemset_support_chart, line_chart
+from .streaming import fits_in_memory, mine_streaming
+from .telegram_client import TelegramError
+
+logger = get_logger(__name__)
+
+# Rows read to tell the layout of a CSV (formats.sniff_format)
+SNIFF_ROWS = 10000
+# Engines a /benchmark upload is mined with
+BENCHMARK_ENGINES = ('apriori', 'fpgrowth')
+# Telegram messages are limited to 4096 characters
+MESSAGE_LIMIT = 4000
+
+
+# fetch
+
+def fetch_telegram(ctx):
+    # The upload's file_id, downloaded with a size cap (and unpacked) into a temporary directory
+    return fetch_upload(ctx.pipeline.telegram, ctx.source)
+
+
+def fetch_local(ctx):
+    # A CSV on disk, read in place
+    return contextlib.nullcontext(ctx.source)
+
+
+# sniff
+
+def sniff_auto(ctx):
+    head = pd.read_csv(ctx.path, nrows=SNIFF_ROWS)
+    log_sampled(logger, logging.DEBUG, "CSV preview:\n%s", head.head())
+    ctx.fmt = sniff_format(head)
+
+
+# encode
+
+def encode_frame(ctx):
+    # The whole file in one read_csv call (pyarrow when installed), then encoded
+    ctx.transactions = _checked(ctx, encode_transactions(read_csv_local(ctx.path), ctx.fmt))
+
+
+def encode_chunked(ctx):
+    # Memory-sized chunks assembled into one matrix. A file too big to mine in memory
+    # isn't loaded; the mine step streams it instead
+    if fits_in_memory(ctx.path):
+        load_chunked(ctx)
+
+
+def encode_deferred(ctx):
+    # Left to the mine step, which may not need the whole file (mine_incremental)
+    pass
+
+
+def load_chunked(ctx, fmt=None):
+    """The upload's TransactionMatrix, loaded in chunks on the first call."""
+    if ctx.transactions is None:
+        transactions = load_transactions(ctx.path, fmt=fmt or ctx.fmt, **csv_engine_kwargs(chunked=True))
+        ctx.transactions = _checked(ctx, transactions)
+    return ctx.transactions
+
+
+def _checked(ctx, transactions):
+    if not transactions.n_transactions or not transactions.n_items:
+        raise ValueError("Empty CSV file after processing.")
+    footprint = transactions.memory_footprint()
+    logger.debug("Loaded transactions memory footprint: %s", footprint)
+    ctx.trace.count(transactions=transactions.n_transactions, items=transactions.n_items)
+    ctx.trace.memory['matrix_bytes'] = footprint['sparse_bytes']
+    if ctx.pipeline.config['preview']:
+        with ctx.trace.stage('preview'):
+            _send_preview(ctx, transactions)
+    return transactions
+
+
+def _send_preview(ctx, transactions):
+    # A quick answer from a sample while the exact run is still mining
+    try:
+        preview = mine_preview(transactions, min_support=ctx.params['min_support'], metric=ctx.params['metric'],
+                               min_threshold=ctx.params['min_threshold'])
+        if preview is not None:
+            ctx.notify(format_preview(preview, rank_by=ctx.params.get('rank_by', DEFAULT_RANK_METRIC)))
+    except Exception:
+        # MemoryError included: a failed preview must never stop the exact run
+        logger.exception("Error building preview for chat %s", ctx.chat_id)
+
+
+# mine
+
+def mine_single(ctx):
+    # Once with params['engine'], or once per engine for a /benchmark upload
+    params = ctx.params
+    if _streamed(ctx, params['min_support']):
+        return
+    engine = params.get('engine', 'auto')
+    if params.get('benchmark'):
+        # The benchmark runs apriori whatever the engine, so budget for it
+        min_support, params['max_len'], _ = guard(ctx, ctx.transactions, params['min_support'], params.get('max_len'), 'apriori')
+        engines = BENCHMARK_ENGINES
+    else:
+        min_support, params['max_len'], engine = guard(ctx, ctx.transactions, params['min_support'], params.get('max_len'), engine)
+        engines = [engine]
+    params['min_support'] = min_support
+    _mine_engines(ctx, min_support, engines)
+
+
+def mine_incremental(ctx):
+    # A re-upload that only appends transactions updates the last run's counts
+    params = ctx.params
+    if params.get('benchmark') or not fits_in_memory(ctx.path):
+        return mine_single(ctx)
+    load = lambda path, fmt: load_chunked(ctx, fmt)
+    plan = functools.partial(guard, ctx)
+    # The thresholds actually mined with: the guardrail's for a full mine, the saved state's for an update
+    min_support, params['max_len'], run = ctx.pipeline.incremental.mine(str(ctx.chat_id), ctx.path, load, plan=plan, **params)
+    params['min_support'] = ctx.min_support = min_support
+    ctx.runs = [run]
+
+
+def mine_sweep(ctx):
+    # Once at the lowest of params['min_support_thresholds']; rank_sweep filters the higher ones
+    params = ctx.params
+    thresholds = sorted(params['min_support_thresholds'])
+    if _streamed(ctx, thresholds[0]):
+        return
+    # Thresholds below what the budget allows are raised to the lowest one that fits.
+    # A re-timed sweep runs apriori whatever the engine, so budget for it
+    engine = 'apriori' if params.get('retime') else params['engine']
+    lowest, params['max_len'], engine = guard(ctx, ctx.transactions, thresholds[0], params.get('max_len'), engine)
+    if not params.get('retime'):
+        params['engine'] = engine
+    params['min_support_thresholds'] = sorted({max(threshold, lowest) for threshold in thresholds})
+    _mine_engines(ctx, params['min_support_thresholds'][0], [params['engine']])
+
+
+def _streamed(ctx, min_support):
+    # Not loaded by the encode step: load it when it fits, else mine in two passes over the file
+    if ctx.transactions is None and fits_in_memory(ctx.path):
+        load_chunked(ctx)
+    if ctx.transactions is not None:
+        return False
+    params = ctx.params
+    ctx.min_support = min_support
+    ctx.runs = [mine_streaming(ctx.path, min_support=min_support, metric=params['metric'], min_threshold=params['min_threshold'],
+                               engine=params.get('engine', 'auto'), max_len=params.get('max_len'), fmt=ctx.fmt,
+                               read_csv_kwargs=csv_engine_kwargs(chunked=True))]
+    return True
+
+
+def _mine_engines(ctx, min_support, engines):
+    # Itemsets only, the rules step derives the rules; the co-occurrence counts are shared
+    ctx.min_support = min_support
+    ctx.pairs = Cooccurrence(ctx.transactions)
+    df = ctx.transactions.to_frame()
+    for engine in engines:
+        start_time = time.time()
+        engine, itemsets = frequent_itemsets(df, min_support=min_support, engine=engine, max_len=ctx.params.get('max_len'),
+                                             pairs=ctx.pairs)
+        ctx.runs.append(MiningResult(engine, itemsets, None, time.time() - start_time))
+
+
+def guard(ctx, transactions, min_support, max_len=None, engine='auto'):
+    """Raise min_support, cap max_len or avoid apriori when the estimate says mining would blow the budget.
+
+    Returns (min_support, max_len, engine); unchanged unless the config enables guardrails.
+    """
+    if not ctx.pipeline.config['guardrails']:
+        return min_support, max_len, engine
+    with ctx.trace.stage('guard'):
+        plan = plan_mining(transactions, min_support, max_len, engine)
+    message = describe_plan(plan)
+    if message:
+        logger.info("Chat %s: min_support %s -> %s, max_len %s -> %s", ctx.chat_id, min_support, plan.min_support, max_len, plan.max_len)
+        ctx.notify(message)
+        # Also in the report, which outlives the message (result cache, saved files)
+        ctx.notes.append(plan_note(plan))
+    return plan.min_support, plan.max_len, plan.engine
+
+
+# rules
+
+def rules_association(ctx):
+    # For the runs mined without rules: association_rules, or the pair rules of the co-occurrence engine
+    for i, run in enumerate(ctx.runs):
+        if run.rules is None:
+            start_time = time.time()
+            rules = derive_rules(run.itemsets, run.engine, ctx.pairs, ctx.min_support, metric=ctx.params['metric'],
+                                 min_threshold=ctx.params['min_threshold'])
+            ctx.runs[i] = run._replace(rules=rules, rules_seconds=time.time() - start_time)
+    ctx.trace.count(itemsets=len(ctx.runs[0].itemsets), rules=len(ctx.runs[0].rules))
+
+
+# rank: each step writes the chat's report
+
+def rank_tables(ctx):
+    run = ctx.runs[0]
+    report = "Top 5 Frequent Itemsets:\n"
+    report += run.itemsets.head(5).to_string(index=False)
+    report += "\n\nTop 5 Association Rules:\n"
+    report += run.rules[['antecedents', 'consequents', 'support', 'confidence']].head(5).to_string(index=False)
+    ctx.report = report
+
+
+def rank_analysis(ctx):
+    rank_by = ctx.params.get('rank_by', DEFAULT_RANK_METRIC)
+    report = "### Analysis Results\n\n"
+    for run in ctx.runs:
+        report += f"**{ENGINE_LABELS[run.engine]} Algorithm** (Time: {run.seconds:.4f} seconds):\n"
+        report += "Top 5 Frequent Itemsets:\n"
+        report += run.itemsets.head(5).to_string(index=False) + "\n\n"
+        report += f"Top 5 Association Rules by {rank_by}:\n"
+        report += top_rules(run.rules, 5, rank_by)[['antecedents', 'consequents', 'support', 'confidence', rank_by]].to_string(index=False) + "\n\n"
+
+    # Only the best rules fit in a Telegram message, so only those get formatted
+    template = "If customers buy **{antecedents}**, they are likely to also buy **{consequents}** (Confidence: {confidence:.2f}, Support: {support:.2f}). Consider placing these items together!"
+    insights = "".join(line + "\n" for line in rule_insights(ctx.runs[0].rules, ctx.params.get('top_k', DEFAULT_TOP_K), rank_by, template))
+    report += "### Actionable Insights for Your Store:\n"
+    report += insights or "No actionable insights available."
+    ctx.report = report
+
+
+def rank_customer_insights(ctx):
+    # The full rule table goes out as a CSV; the message only formats the best rules
+    template = "If customers buy **{antecedents}**, they are likely to also buy **{consequents}** (Confidence: {confidence:.2f}, Support: {support:.2f})."
+    insights = rule_insights(ctx.runs[0].rules, ctx.params.get('top_k', DEFAULT_TOP_K), ctx.params.get('rank_by', DEFAULT_RANK_METRIC), template)
+    report = "### Customer Insights:\n\n"
+    report += "".join(line + "\n" for line in insights) or "No actionable insights available."
+    if ctx.params.get('benchmark'):
+        report += "\n\n### Benchmark:\n"
+        report += "\n".join(f"{ENGINE_LABELS[run.engine]}: {run.seconds:.4f} seconds" for run in ctx.runs)
+    ctx.report = report
+
+
+def rank_saved_notice(ctx):
+    # The insights go out as a CSV (render_insights_csv)
+    ctx.report = "Customer insights generated and saved successfully."
+
+
+def rank_engine_summary(ctx):
+    lines = [f"{ENGINE_LABELS[run.engine]} Algorithm:\n- Execution Time: {run.seconds:.4f} seconds\n- Rules Generated: {len(run.rules)}"
+             for run in ctx.runs]
+    # Only a benchmark run has something to compare
+    if len(ctx.runs) > 1:
+        fastest = min(ctx.runs, key=lambda run: run.seconds)
+        lines.append(f"Suggestion: Use the {ENGINE_LABELS[fastest.engine]} algorithm for better performance.")
+    ctx.report = "\n".join(lines)
+
+
+def rank_sweep(ctx):
+    # The itemsets and rules of every threshold are filtered from the one mined at the lowest;
+    # a /benchmark upload also re-times the engines at each threshold (that needs the data in memory)
+    params = ctx.params
+    base = ctx.runs[0]
+    retime = params.get('retime') and ctx.transactions is not None
+    df = ctx.transactions.to_frame() if retime else None
+    _, ctx.sweep = sweep(df, params['min_support_thresholds'], metric=params['metric'], min_threshold=params['min_threshold'],
+                         engine=params['engine'], retime=retime, base=base, max_len=params.get('max_len'))
+
+    lines = [f"{ENGINE_LABELS[base.engine]} Algorithm:\n- Mined once at min support {ctx.sweep[0].threshold} in {base.seconds * 1000:.4f} ms"]
+    for result in ctx.sweep:
+        lines.append(f"Min Support {result.threshold}:\n- Frequent Itemsets: {len(result.itemsets)}\n- Rules Generated: {len(result.rules)}")
+    # Only a re-timed sweep has engines to compare
+    if ctx.sweep[0].timings:
+        averages = {}
+        for name in ctx.sweep[0].timings:
+            averages[name] = sum(result.timings[name] for result in ctx.sweep) / len(ctx.sweep) * 1000
+            lines.append(f"{ENGINE_LABELS[name]} Algorithm:\n- Average Execution Time: {averages[name]:.4f} ms")
+        fastest = min(averages, key=averages.get)
+        lines.append(f"Suggestion: Use the {ENGINE_LABELS[fastest]} algorithm for better performance.")
+    ctx.report = "\n".join(lines)
+
+
+# render: each step adds files to ctx.files, written to the job's directory
+
+def _exported(ctx):
+    # (engine suffix, itemsets, rules) of the results the files describe. A sweep exports
+    # its highest threshold; several runs (a benchmark) one set of files per engine
+    if ctx.sweep:
+        return [(None, ctx.sweep[-1].itemsets, ctx.sweep[-1].rules)]
+    if len(ctx.runs) > 1:
+        return [(run.engine, run.itemsets, run.rules) for run in ctx.runs]
+    return [(None, ctx.runs[0].itemsets, ctx.runs[0].rules)]
+
+
+def render_tables(ctx):
+    for engine, itemsets, rules in _exported(ctx):
+        suffix = f"{engine}_{ctx.chat_id}" if engine else f"{ctx.chat_id}"
+        for name, table in (('frequent_itemsets', itemsets), ('rules', rules)):
+            path = os.path.join(ctx.workdir, f"{name}_{suffix}.csv")
+            table.to_csv(path, index=False)
+            ctx.files.append(path)
+
+
+def render_insights_csv(ctx):
+    # Every rule with its insight sentence, best first
+    path = os.path.join(ctx.workdir, f"insights_{ctx.chat_id}.csv")
+    ctx.files.append(export_insights(ctx.runs[0].rules, path, ctx.params.get('rank_by', DEFAULT_RANK_METRIC)))
+
+
+def render_support_chart(ctx):
+    # One support graph per engine that ran, of its most frequent itemsets only, drawn by the render workers
+    chart = itemset_support_chart([(f'{ENGINE_LABELS[run.engine]} Frequent Itemsets Support', run.itemsets) for run in ctx.runs])
+    path = ctx.pipeline.renderer.render(chart, os.path.join(ctx.workdir, 'frequent_itemsets_graph.png'))
+    if path:
+        ctx.files.append(path)
+
+
+def render_report(ctx):
+    path = os.path.join(ctx.workdir, 'analysis_report.txt')
+    with open(path, 'w') as f:
+        f.write(ctx.report)
+    ctx.files.append(path)
+
+
+def render_sweep_chart(ctx):
+    thresholds = [result.threshold for result in ctx.sweep]
+    if ctx.sweep[0].timings:
+        # Re-timed sweep: compare the engines at every threshold, in milliseconds
+        series = [(ENGINE_LABELS[name], thresholds, [result.timings[name] * 1000 for result in ctx.sweep])
+                  for name in ctx.sweep[0].timings]
+        chart = line_chart("Run Time of Apriori and FP-Growth Algorithms vs. Min Support Threshold", "Min Support Threshold",
+                           "Run Time (ms)", series)
+        name = f'runtime_comparison_{ctx.chat_id}.png'
+    else:
+        series = [("Frequent Itemsets", thresholds, [len(result.itemsets) for result in ctx.sweep]),
+                  ("Association Rules", thresholds, [len(result.rules) for result in ctx.sweep])]
+        chart = line_chart("Frequent Itemsets and Rules vs. Min Support Threshold", "Min Support Threshold", "Count", series)
+        name = f'support_sweep_{ctx.chat_id}.png'
+    path = ctx.pipeline.renderer.render(chart, os.path.join(ctx.workdir, name))
+    if path:
+        ctx.files.append(path)
+
+
+def render_network(ctx):
+    # Top rules by lift: a PNG, plus HTML and GraphML for large rule sets
+    _, _, rules = _exported(ctx)[0]
+    ctx.files += export_network(rules, ctx.workdir, f'network_model_{ctx.chat_id}', ctx.pipeline.renderer)
+
+
+# deliver
+
+def deliver_telegram(ctx):
+    telegram, parse_mode = ctx.pipeline.telegram, ctx.pipeline.config['parse_mode']
+    try:
+        telegram.send_message(ctx.chat_id, ctx.report[:MESSAGE_LIMIT], parse_mode=parse_mode)
+    except TelegramError as e:
+        logger.error("Error sending message to chat %s: %s", ctx.chat_id, e)
+    if ctx.files:
+        try:
+            telegram.send_documents(ctx.chat_id, ctx.files)
+        except TelegramError as e:
+            logger.error("Error sending files to chat %s: %s", ctx.chat_id, e)
+
+
+def deliver_recommender(ctx):
+    # /recommend answers from this chat's latest upload from now on. The model is stored
+    # too, a cached one included, so a restart or another process that mmaps it serves
+    # the same rules. The lowest threshold's rules are used, they cover the most baskets
+    if ctx.model is None:
+        run = ctx.runs[0]
+        params = {key: ctx.params.get(key) for key in ('metric', 'min_threshold', 'max_len')}
+        ctx.model = (run.itemsets, run.rules, dict(params, min_support=ctx.min_support, engine=run.engine))
+    itemsets, rules, params = ctx.model
+    ctx.pipeline.model_store.save(str(ctx.chat_id), itemsets, rules, params)
+    ctx.pipeline.rule_indexes.publish(ctx.chat_id, RuleIndex(rules))
+
+
+def deliver_suggestions(ctx):
+    # The model's suggestions are streamed into the chat by the suggestion worker when ready
+    ctx.pipeline.suggester.submit(ctx.chat_id, ctx.report)
+
+
+def deliver_suggestions_with_tip(ctx):
+    ctx.pipeline.suggester.submit(ctx.chat_id, ctx.report, suffix=f"\n\n**Market Tip:** {market_tip(ctx.report)}")
+
+
+def market_tip(report):
+    # A canned tip picked by keywords of the report
+    if "high value" in report.lower():
+        return "Consider targeting high-value customers with personalized offers."
+    elif "frequent" in report.lower():
+        return "Leverage frequent purchases to create loyalty programs."
+    else:
+        return "Stay updated with market trends to enhance your strategies."
+
+
+def deliver_local(ctx):
+    # The CLI: the report to stdout, the files copied to ctx.output_dir
+    if ctx.report:
+        print(ctx.report)
+    os.makedirs(ctx.output_dir, exist_ok=True)
+    for path in ctx.files:
+        shutil.copy(path, ctx.output_dir)
+        print(f"Saved {os.path.join(ctx.output_dir, os.path.basename(path))}")
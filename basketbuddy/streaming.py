@@ -0,0 +1,66 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from .encoding import count_itemsets
+from .loader import available_memory, iter_transaction_chunks
+from .mining import MiningResult, association_rules, frequent_itemsets
+
+# Rough peak memory of encoding and mining a CSV in one go, per byte of file
+MEMORY_PER_FILE_BYTE = 8
+
+
+def fits_in_memory(path, memory_budget=None):
+    """Whether the whole file can be loaded and mined at once within the budget
+    (half the free memory by default)."""
+    budget = memory_budget or available_memory() // 2
+    return os.path.getsize(path) * MEMORY_PER_FILE_BYTE <= budget
+
+
+def mine_streaming(source, min_support=0.05, metric="confidence", min_threshold=0.7, engine='auto', max_len=None,
+                   chunksize=None, memory_budget=None, fmt=None, read_csv_kwargs=None):
+    """Frequent itemsets and rules of a CSV too big for memory, in two passes (SON).
+
+    Pass one mines every chunk on its own at the same relative min_support; an itemset
+    frequent in the whole file is frequent in at least one chunk, so the union of the
+    chunk results holds every answer. Pass two counts those candidates over all chunks
+    and keeps the ones that are really frequent, so the result equals mining the file
+    in memory. Only one chunk and the candidate set are held at a time; chunks are sized
+    for `memory_budget` as in load_transactions. `source` is read twice, so it must be
+    a path or a seekable file. `read_csv_kwargs` go to pd.read_csv (kept apart since
+    both take an `engine`).
+    """
+    start_time = time.time()
+    read_csv_kwargs = read_csv_kwargs or {}
+    start = source.tell() if hasattr(source, 'seek') else None
+
+    candidates = set()
+    for fmt, chunk in iter_transaction_chunks(source, chunksize, memory_budget, fmt, **read_csv_kwargs):
+        _, local = frequent_itemsets(chunk.to_frame(), min_support=min_support, engine=engine, max_len=max_len)
+        candidates.update(local['itemsets'])
+
+    if start is not None:
+        source.seek(start)
+    candidates = list(candidates)
+    counts = np.zeros(len(candidates), dtype=np.int64)
+    n_transactions = 0
+    for _, chunk in iter_transaction_chunks(source, chunksize, memory_budget, fmt, **read_csv_kwargs):
+        counts += count_itemsets(chunk, candidates)
+        n_transactions += chunk.n_transactions
+
+    frequent = [
+        (count / n_transactions, itemset) for itemset, count in zip(candidates, counts)
+        if n_transactions and count / n_transactions >= min_support
+    ]
+    itemsets = pd.DataFrame({
+        'support': [support for support, _ in frequent],
+        'itemsets': [itemset for _, itemset in frequent],
+    })
+    itemsets = itemsets.sort_values('support', ascending=False, kind='stable').reset_index(drop=True)
+    seconds = time.time() - start_time
+
+    start_time = time.time()
+    rules = association_rules(itemsets, metric=metric, min_threshold=min_threshold)
+    return MiningResult('streaming', itemsets, rules, seconds, time.time() - start_time)
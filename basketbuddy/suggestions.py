@@ -0,0 +1,233 @@
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+
+import requests
+
+from .metrics import get_logger
+from .telegram_client import TelegramError
+
+logger = get_logger(__name__)
+
+# Local Ollama server the suggestions come from, and the model it runs
+OLLAMA_URL = os.environ.get('OLLAMA_URL', 'http://127.0.0.1:11434')
+SUGGESTION_MODEL = os.environ.get('BASKETBUDDY_SUGGESTION_MODEL', 'gemma2:2b')
+# 'ollama', or 'stub' for a canned answer without a model (tests, local runs)
+SUGGESTION_BACKEND = os.environ.get('BASKETBUDDY_SUGGESTION_BACKEND', 'ollama')
+# How long the server keeps the model loaded after a request, so uploads don't cold-start it
+KEEP_ALIVE = '30m'
+
+# Telegram allows about one edit per second per chat; the streamed message is edited at most this often
+EDIT_INTERVAL = 1.5
+# Telegram's limit on the length of a message
+MESSAGE_MAX = 4096
+PLACEHOLDER = "Working on suggestions..."
+UNAVAILABLE = "Suggestions are unavailable right now."
+
+
+class OllamaBackend:
+    """Streams completions from a long-lived Ollama server over its HTTP API.
+
+    The server keeps the model in memory between requests (`keep_alive`), unlike
+    `ollama run`, which started the CLI and loaded the model for every upload.
+    """
+
+    def __init__(self, url=OLLAMA_URL, model=SUGGESTION_MODEL, keep_alive=KEEP_ALIVE, timeout=(5, 300)):
+        self.url = url.rstrip('/')
+        self.model = model
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def warm_up(self):
+        # A request without a prompt only loads the model
+        self.session.post(f"{self.url}/api/generate", json={"model": self.model, "keep_alive": self.keep_alive},
+                          timeout=self.timeout).raise_for_status()
+
+    def generate(self, prompt):
+        """Yield the completion of `prompt` piece by piece as the server produces it."""
+        payload = {"model": self.model, "prompt": prompt, "stream": True, "keep_alive": self.keep_alive}
+        with self.session.post(f"{self.url}/api/generate", json=payload, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get('error'):
+                    raise RuntimeError(chunk['error'])
+                yield chunk.get('response', '')
+                if chunk.get('done'):
+                    return
+
+
+class StubBackend:
+    """Answers every prompt with a fixed text, word by word, without a model."""
+
+    model = 'stub'
+
+    def __init__(self, reply="Here are some analysis like association rules, network graph, comparison curve etc."):
+        self.reply = reply
+
+    def warm_up(self):
+        pass
+
+    def generate(self, prompt):
+        for word in self.reply.split(' '):
+            yield word + ' '
+
+
+BACKENDS = {
+    'ollama': OllamaBackend,
+    'stub': StubBackend,
+}
+
+
+class SuggestionCache:
+    """Model answers on disk, one text file per sha256 of the model name and the prompt.
+
+    The oldest answers are dropped once there are more than `max_entries`.
+    """
+
+    def __init__(self, directory, max_entries=1000):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, model, prompt):
+        return hashlib.sha256(f"{model}\0{prompt}".encode()).hexdigest()
+
+    def get(self, key):
+        try:
+            with open(os.path.join(self.directory, f"{key}.txt"), encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, key, text):
+        path = os.path.join(self.directory, f"{key}.txt")
+        staging = f"{path}.{threading.get_ident()}.tmp"
+        with open(staging, 'w', encoding='utf-8') as f:
+            f.write(text)
+        with self._lock:
+            os.replace(staging, path)
+            entries = sorted(
+                (entry.stat().st_mtime, entry.path) for entry in os.scandir(self.directory) if entry.name.endswith('.txt')
+            )
+            for _, old in entries[:max(len(entries) - self.max_entries, 0)]:
+                os.remove(old)
+
+
+class SuggestionService:
+    """Generates the LLM suggestions for an upload's insights off the request path.
+
+    `submit` only queues the insights; one worker thread asks the backend, so the
+    model server sees one request at a time. The answer is streamed into the chat by
+    editing a placeholder message as text arrives, then cached by the hash of the
+    insights so the same report is answered at once. Outcomes and durations go to
+    `metrics` (a metrics.Metrics) when one is given.
+    """
+
+    def __init__(self, telegram, backend=None, cache=None, parse_mode=None, max_depth=50, metrics=None):
+        self.telegram = telegram
+        self.backend = backend or BACKENDS[SUGGESTION_BACKEND]()
+        self.cache = cache
+        self.parse_mode = parse_mode
+        self.metrics = metrics
+        self._queue = queue.Queue(maxsize=max_depth)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        # The worker is started on first use so importing a script never spawns threads
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._work, name="suggestion-worker", daemon=True)
+                self._thread.start()
+
+    def submit(self, chat_id, insights, suffix=''):
+        """Queue suggestions for `insights`; `suffix` is appended to the model's answer."""
+        self.start()
+        try:
+            self._queue.put_nowait((chat_id, insights, suffix))
+        except queue.Full:
+            logger.warning("Suggestion queue full, skipping chat %s", chat_id)
+            self._send(chat_id, UNAVAILABLE)
+
+    def _work(self):
+        try:
+            self.backend.warm_up()
+        except Exception as e:
+            logger.warning("Could not load the suggestion model: %s", e)
+        while True:
+            chat_id, insights, suffix = self._queue.get()
+            start = time.perf_counter()
+            try:
+                source = self._suggest(chat_id, insights, suffix)
+            except Exception:
+                logger.exception("Suggestions for chat %s failed", chat_id)
+                source = 'error'
+            if self.metrics is not None:
+                self.metrics.inc('suggestions_total', source=source)
+                self.metrics.observe('suggestion_seconds', time.perf_counter() - start)
+
+    def _suggest(self, chat_id, insights, suffix):
+        key = self.cache.key(self.backend.model, insights) if self.cache is not None else None
+        answer = self.cache.get(key) if key is not None else None
+        if answer is not None:
+            self._send(chat_id, answer + suffix)
+            return 'cache'
+
+        message = self._send(chat_id, PLACEHOLDER)
+        pieces = []
+        shown, last_edit = PLACEHOLDER, time.monotonic()
+        try:
+            for piece in self.backend.generate(insights):
+                pieces.append(piece)
+                text = ''.join(pieces).strip()
+                if message is not None and text and text != shown and time.monotonic() - last_edit >= EDIT_INTERVAL:
+                    # Plain text while streaming: half a Markdown entity would be rejected
+                    self._edit(chat_id, message, text, None)
+                    shown, last_edit = text, time.monotonic()
+        except Exception as e:
+            logger.warning("Suggestion model failed for chat %s: %s", chat_id, e)
+            self._edit_or_send(chat_id, message, UNAVAILABLE, None)
+            return 'error'
+
+        answer = ''.join(pieces).strip()
+        if not answer:
+            self._edit_or_send(chat_id, message, UNAVAILABLE, None)
+            return 'error'
+        if key is not None:
+            self.cache.put(key, answer)
+        self._edit_or_send(chat_id, message, answer + suffix, self.parse_mode)
+        return 'model'
+
+    def _send(self, chat_id, text):
+        # message_id of the sent message, or None if it couldn't be sent. Falls back to
+        # plain text when the model's Markdown doesn't parse
+        for parse_mode in dict.fromkeys([self.parse_mode, None]):
+            try:
+                return self.telegram.send_message(chat_id, text[:MESSAGE_MAX], parse_mode=parse_mode)['message_id']
+            except TelegramError as e:
+                error = e
+        logger.error("Error sending suggestions to chat %s: %s", chat_id, error)
+        return None
+
+    def _edit(self, chat_id, message_id, text, parse_mode):
+        try:
+            self.telegram.edit_message_text(chat_id, message_id, text[:MESSAGE_MAX], parse_mode=parse_mode)
+            return True
+        except TelegramError as e:
+            logger.debug("Error editing suggestions in chat %s: %s", chat_id, e)
+            return False
+
+    def _edit_or_send(self, chat_id, message_id, text, parse_mode):
+        if message_id is None:
+            self._send(chat_id, text)
+        # Plain text again when the model's Markdown doesn't parse
+        elif not self._edit(chat_id, message_id, text, parse_mode) and parse_mode:
+            self._edit(chat_id, message_id, text, None)
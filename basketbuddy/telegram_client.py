@@ -0,0 +1,143 @@
+import json
+import os
+import time
+from contextlib import ExitStack
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Point this at a local fake server to run the bots without reaching Telegram
+TELEGRAM_API_BASE = os.environ.get('TELEGRAM_API_BASE', 'https://api.telegram.org')
+
+# sendMediaGroup accepts between 2 and 10 items
+MEDIA_GROUP_MAX = 10
+
+
+class TelegramError(Exception):
+    """Raised when a Bot API call still fails after all retries."""
+
+    def __init__(self, method, description, status_code=None):
+        super().__init__(f"{method} failed: {description}")
+        self.method = method
+        self.description = description
+        self.status_code = status_code
+
+
+class FileTooLargeError(ValueError):
+    """Raised when an upload is bigger than the download limit."""
+
+    def __init__(self, size, limit):
+        super().__init__(f"The file is too large ({size / 1e6:.1f} MB, the limit is {limit / 1e6:.1f} MB).")
+        self.size = size
+        self.limit = limit
+
+
+class TelegramClient:
+    """Bot API client sharing one pooled keep-alive session across all calls.
+
+    Every call has a (connect, read) timeout. Connection errors, 429 and 5xx responses
+    are retried with exponential backoff; a 429 waits for the `retry_after` Telegram
+    asks for instead.
+    """
+
+    def __init__(self, token, base_url=TELEGRAM_API_BASE, timeout=(5, 60), max_retries=3, backoff=0.5, pool_size=10):
+        self.token = token
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def call(self, method, data=None, files=None):
+        """POST a Bot API method and return its `result`.
+
+        `files` maps form field names to local paths; they are reopened on every attempt
+        so a retried upload sends the whole file again.
+        """
+        url = f"{self.base_url}/bot{self.token}/{method}"
+        for attempt in range(self.max_retries + 1):
+            delay = self.backoff * 2 ** attempt
+            try:
+                with ExitStack() as stack:
+                    opened = {field: stack.enter_context(open(path, 'rb')) for field, path in (files or {}).items()}
+                    response = self.session.post(url, data=data, files=opened or None, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries:
+                    raise TelegramError(method, str(e))
+                time.sleep(delay)
+                continue
+
+            try:
+                payload = response.json()
+            except ValueError:
+                payload = {"ok": False, "description": response.text}
+            if payload.get('ok'):
+                return payload.get('result')
+
+            retryable = response.status_code == 429 or response.status_code >= 500
+            if not retryable or attempt == self.max_retries:
+                raise TelegramError(method, payload.get('description', response.text), response.status_code)
+            retry_after = (payload.get('parameters') or {}).get('retry_after')
+            time.sleep(retry_after if retry_after is not None else delay)
+
+    def send_message(self, chat_id, text, parse_mode=None):
+        data = {'chat_id': chat_id, 'text': text}
+        if parse_mode:
+            data['parse_mode'] = parse_mode
+        return self.call('sendMessage', data=data)
+
+    def edit_message_text(self, chat_id, message_id, text, parse_mode=None):
+        data = {'chat_id': chat_id, 'message_id': message_id, 'text': text}
+        if parse_mode:
+            data['parse_mode'] = parse_mode
+        return self.call('editMessageText', data=data)
+
+    def send_document(self, chat_id, path):
+        return self.call('sendDocument', data={'chat_id': chat_id}, files={'document': path})
+
+    def send_documents(self, chat_id, paths):
+        """Send several files, batching them into sendMediaGroup albums of up to 10."""
+        paths = list(paths)
+        results = []
+        for start in range(0, len(paths), MEDIA_GROUP_MAX):
+            batch = paths[start:start + MEDIA_GROUP_MAX]
+            if len(batch) == 1:
+                results.append(self.send_document(chat_id, batch[0]))
+                continue
+            files = {f'file{i}': path for i, path in enumerate(batch)}
+            media = [{'type': 'document', 'media': f'attach://{field}'} for field in files]
+            results.extend(self.call('sendMediaGroup', data={'chat_id': chat_id, 'media': json.dumps(media)}, files=files))
+        return results
+
+    def file_url(self, file_path):
+        return f"{self.base_url}/file/bot{self.token}/{file_path}"
+
+    def download_file(self, file_id, directory, max_bytes, chunk_size=1 << 16):
+        """Stream an uploaded file into `directory` and return its local path.
+
+        Raises FileTooLargeError as soon as the file is known to exceed `max_bytes`, from
+        getFile's file_size, the Content-Length header or the bytes received so far.
+        """
+        result = self.call('getFile', data={'file_id': file_id})
+        if result.get('file_size') and result['file_size'] > max_bytes:
+            raise FileTooLargeError(result['file_size'], max_bytes)
+
+        path = os.path.join(directory, os.path.basename(result['file_path']))
+        try:
+            with self.session.get(self.file_url(result['file_path']), stream=True, timeout=self.timeout) as response:
+                response.raise_for_status()
+                if int(response.headers.get('Content-Length') or 0) > max_bytes:
+                    raise FileTooLargeError(int(response.headers['Content-Length']), max_bytes)
+                received = 0
+                with open(path, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size):
+                        received += len(chunk)
+                        if received > max_bytes:
+                            raise FileTooLargeError(received, max_bytes)
+                        f.write(chunk)
+        except requests.RequestException as e:
+            raise TelegramError('download', str(e))
+        return path
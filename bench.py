@@ -0,0 +1,244 @@
+"""Benchmark the upload-to-insights pipeline on synthetic basket data, without Telegram.
+
+    python bench.py --sizes 10000 100000 --supports 0.01 0.05 --output bench.json
+
+Every (size, min_support) point runs in a fresh process so its peak RSS is its own.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+import pandas as pd
+
+from basketbuddy.download import HAS_PYARROW, read_csv_local
+from basketbuddy.encoding import encode_transactions
+from basketbuddy.formats import sniff_format
+from basketbuddy.lazy import HEAVY_MODULES, warm_up
+from basketbuddy.metrics import peak_rss_bytes
+from basketbuddy.mining import ENGINES, mine
+from basketbuddy.ranking import DEFAULT_RANK_METRIC, DEFAULT_TOP_K, export_insights, rule_insights
+from basketbuddy.rendering import draw_chart, itemset_support_chart
+
+DEFAULT_SIZES = (10000, 100000)
+DEFAULT_SUPPORTS = (0.01, 0.05)
+DEFAULT_ITEMS = 1000
+DEFAULT_BASKET_SIZE = 10
+DEFAULT_PATTERNS = 2000
+DEFAULT_PATTERN_SIZE = 4
+DEFAULT_SKEW = 1.0
+
+STAGES = ('parse', 'preprocess', 'mining', 'rules', 'insights', 'plotting')
+# Imported before the first timed run, or a fresh worker would charge them to the stage
+# that loads them first (matplotlib to plotting, mlxtend to mining, pyarrow to parse)
+WARM_UP_MODULES = HEAVY_MODULES + (['pyarrow.csv'] if HAS_PYARROW else [])
+
+
+def generate_baskets(n_transactions, n_items=DEFAULT_ITEMS, avg_basket_size=DEFAULT_BASKET_SIZE,
+                     n_patterns=DEFAULT_PATTERNS, avg_pattern_size=DEFAULT_PATTERN_SIZE, skew=DEFAULT_SKEW,
+                     correlation=0.5, random_state=0):
+    """Synthetic transactions in the style of IBM's Quest generator, as (row, item id) arrays.
+
+    A pool of `n_patterns` potentially frequent itemsets is drawn first: pattern sizes
+    are Poisson around `avg_pattern_size`, and each pattern reuses about `correlation`
+    of the previous pattern's items. Pattern weights follow a Zipf law with exponent
+    `skew` (0 makes every pattern equally likely). Each transaction is filled with
+    weighted patterns until it reaches its Poisson basket size, and every item of a
+    pattern is dropped with the pattern's own corruption level.
+    """
+    rng = np.random.default_rng(random_state)
+
+    patterns = []
+    previous = np.array([], dtype=np.int64)
+    for _ in range(n_patterns):
+        size = min(max(rng.poisson(avg_pattern_size), 1), n_items)
+        n_reused = min(int(round(rng.exponential(correlation) * size)), size, len(previous))
+        reused = rng.choice(previous, n_reused, replace=False) if n_reused else previous[:0]
+        fresh = rng.choice(n_items, size, replace=False)
+        pattern = np.unique(np.concatenate([reused, fresh]))[:size]
+        patterns.append(pattern)
+        previous = pattern
+    lengths = np.array([len(pattern) for pattern in patterns])
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    flat = np.concatenate(patterns)
+
+    weights = 1.0 / np.arange(1, n_patterns + 1) ** skew
+    weights = rng.permutation(weights / weights.sum())
+    corruption = np.clip(rng.normal(0.5, 0.1, n_patterns), 0, 1)
+
+    # Enough patterns per transaction to reach its basket size on average after corruption
+    sizes = np.maximum(rng.poisson(avg_basket_size, n_transactions), 1)
+    kept_per_pattern = max(float((lengths * (1 - corruption)) @ weights), 1.0)
+    picks_per_row = np.maximum(np.rint(sizes / kept_per_pattern), 1).astype(np.int64)
+    picks = rng.choice(n_patterns, int(picks_per_row.sum()), p=weights)
+    pick_rows = np.repeat(np.arange(n_transactions), picks_per_row)
+
+    # Expand every pick into its pattern's items, then corrupt them
+    pick_lengths = lengths[picks]
+    rows = np.repeat(pick_rows, pick_lengths)
+    starts = np.repeat(offsets[picks] - np.concatenate([[0], np.cumsum(pick_lengths)[:-1]]), pick_lengths)
+    items = flat[starts + np.arange(len(rows))]
+    keep = rng.random(len(rows)) >= np.repeat(corruption[picks], pick_lengths)
+
+    # Transactions that lost every item keep one, as a shopper buys at least something
+    rows, items = rows[keep], items[keep]
+    empty = np.setdiff1d(np.arange(n_transactions), rows)
+    rows = np.concatenate([rows, empty])
+    items = np.concatenate([items, rng.integers(0, n_items, len(empty))])
+
+    cells = np.unique(rows * n_items + items)
+    return cells // n_items, cells % n_items
+
+
+def write_baskets(path, rows, items, delimiter=';'):
+    """Write (row, item id) pairs as a one-column basket CSV, the layout most uploads use."""
+    vocab = np.array([f'item{item:05d}' for item in range(int(items.max()) + 1)], dtype=object)
+    # Rows come sorted from generate_baskets, so each basket is one contiguous slice
+    bounds = np.flatnonzero(np.diff(rows)) + 1
+    baskets = [delimiter.join(basket) for basket in np.split(vocab[items], bounds)]
+    pd.DataFrame({'items': baskets}).to_csv(path, index=False)
+    return os.path.getsize(path)
+
+
+def run_pipeline(path, min_support, metric="confidence", min_threshold=0.7, engine='auto', max_len=None,
+                 top_k=DEFAULT_TOP_K, rank_by=DEFAULT_RANK_METRIC):
+    """Run one upload through every stage and return the per-stage seconds and result sizes."""
+    seconds = {}
+    workdir = tempfile.mkdtemp(prefix='basketbuddy-bench-')
+    try:
+        start = time.perf_counter()
+        df = read_csv_local(path)
+        seconds['parse'] = time.perf_counter() - start
+
+        # What preprocess_transaction_data does in the scripts
+        start = time.perf_counter()
+        transactions = encode_transactions(df, sniff_format(df))
+        frame = transactions.to_frame()
+        seconds['preprocess'] = time.perf_counter() - start
+
+        result = mine(frame, min_support=min_support, metric=metric, min_threshold=min_threshold, engine=engine, max_len=max_len)
+        engine, itemsets, rules = result.engine, result.itemsets, result.rules
+        seconds['mining'] = result.seconds
+        seconds['rules'] = result.rules_seconds
+
+        start = time.perf_counter()
+        rule_insights(rules, top_k, rank_by)
+        export_insights(rules, os.path.join(workdir, 'insights.csv'), rank_by)
+        seconds['insights'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        # Drawn in this process, without the render pool or its cache, to time the drawing itself
+        draw_chart(itemset_support_chart([('Frequent Itemsets Support', itemsets)]), os.path.join(workdir, 'itemsets.png'))
+        seconds['plotting'] = time.perf_counter() - start
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        'engine': engine,
+        'n_transactions': transactions.n_transactions,
+        'n_items': transactions.n_items,
+        'nonzeros': int(transactions.matrix.nnz),
+        'n_itemsets': len(itemsets),
+        'n_rules': len(rules),
+        'seconds': seconds,
+    }
+
+
+def bench_point(path, min_support, repeat=1, **kwargs):
+    """Best-of-`repeat` stage timings for one file and threshold, with throughput and peak RSS.
+
+    The libraries' import time is kept out of the stages and reported as `import_seconds`.
+    """
+    import_seconds = sum(warm_up(WARM_UP_MODULES).values())
+    runs = [run_pipeline(path, min_support, **kwargs) for _ in range(repeat)]
+    result = runs[0]
+    result['import_seconds'] = import_seconds
+    result['seconds'] = {stage: min(run['seconds'][stage] for run in runs) for stage in STAGES}
+    result['seconds']['total'] = sum(result['seconds'][stage] for stage in STAGES)
+    result['transactions_per_second'] = {
+        stage: result['n_transactions'] / seconds if seconds else None
+        for stage, seconds in result['seconds'].items()
+    }
+    result['peak_rss_bytes'] = peak_rss_bytes()
+    return result
+
+
+def run_grid(sizes=DEFAULT_SIZES, supports=DEFAULT_SUPPORTS, n_items=DEFAULT_ITEMS, avg_basket_size=DEFAULT_BASKET_SIZE,
+             n_patterns=DEFAULT_PATTERNS, avg_pattern_size=DEFAULT_PATTERN_SIZE, skew=DEFAULT_SKEW, random_state=0,
+             repeat=1, **pipeline_kwargs):
+    """Benchmark every size x min_support pair; each pair runs in its own fresh process."""
+    results = []
+    datadir = tempfile.mkdtemp(prefix='basketbuddy-bench-data-')
+    try:
+        for size in sizes:
+            start = time.perf_counter()
+            rows, items = generate_baskets(size, n_items, avg_basket_size, n_patterns, avg_pattern_size, skew,
+                                           random_state=random_state)
+            path = os.path.join(datadir, f'baskets_{size}.csv')
+            file_bytes = write_baskets(path, rows, items)
+            generate_seconds = time.perf_counter() - start
+            print(f"Generated {size} transactions ({file_bytes / 1e6:.1f} MB) in {generate_seconds:.2f} seconds", file=sys.stderr)
+
+            for min_support in supports:
+                with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as pool:
+                    result = pool.submit(bench_point, path, min_support, repeat, **pipeline_kwargs).result()
+                result.update(size=size, min_support=min_support, file_bytes=file_bytes,
+                              generate_seconds=generate_seconds,
+                              parse_mb_per_second=file_bytes / 1e6 / result['seconds']['parse'])
+                print(f"size={size} min_support={min_support}: {result['seconds']['total']:.2f} seconds, "
+                      f"{result['n_itemsets']} itemsets, {result['n_rules']} rules, "
+                      f"peak RSS {result['peak_rss_bytes'] / 1e6:.0f} MB", file=sys.stderr)
+                results.append(result)
+    finally:
+        shutil.rmtree(datadir, ignore_errors=True)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Numbers of transactions")
+    parser.add_argument('--supports', type=float, nargs='+', default=DEFAULT_SUPPORTS, help="min_support thresholds")
+    parser.add_argument('--items', type=int, default=DEFAULT_ITEMS, help="Number of distinct items")
+    parser.add_argument('--basket-size', type=float, default=DEFAULT_BASKET_SIZE, help="Average items per transaction")
+    parser.add_argument('--patterns', type=int, default=DEFAULT_PATTERNS, help="Number of potentially frequent patterns")
+    parser.add_argument('--pattern-size', type=float, default=DEFAULT_PATTERN_SIZE, help="Average pattern size")
+    parser.add_argument('--skew', type=float, default=DEFAULT_SKEW, help="Zipf exponent of the pattern weights")
+    parser.add_argument('--engine', default='auto', choices=['auto', *ENGINES, 'cooccurrence'])
+    parser.add_argument('--metric', default='confidence')
+    parser.add_argument('--min-threshold', type=float, default=0.7)
+    parser.add_argument('--max-len', type=int, default=None)
+    parser.add_argument('--repeat', type=int, default=1, help="Runs per point; the fastest time of each stage is kept")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    results = run_grid(args.sizes, args.supports, args.items, args.basket_size, args.patterns, args.pattern_size,
+                       args.skew, random_state=args.seed, repeat=args.repeat, engine=args.engine,
+                       metric=args.metric, min_threshold=args.min_threshold, max_len=args.max_len)
+    report = {
+        'machine': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'config': {key: value for key, value in vars(args).items() if key != 'output'},
+        'results': results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+        print(f"Benchmark report saved at: {args.output}")
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
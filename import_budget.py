@@ -0,0 +1,73 @@
+"""Check that the bots still boot fast: a cold import of each script within a time budget.
+
+    python import_budget.py                       # every bot, the default budget
+    python import_budget.py --budget 1.5 script6
+
+Each script is imported in a fresh interpreter, the fastest of --repeat runs counts.
+Exits with status 1 when a script is over budget or loads one of the plotting and
+mining libraries (basketbuddy.lazy.HEAVY_MODULES) at import, so it can gate CI.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from basketbuddy.lazy import HEAVY_MODULES
+
+SCRIPTS = ('script1', 'script2', 'script3', 'script4', 'script5', 'script6')
+# Seconds for a cold import of one bot; they take about 0.6-0.9 s on a laptop-class core,
+# twice that when matplotlib and mlxtend were imported eagerly
+DEFAULT_BUDGET = 1.2
+DEFAULT_REPEAT = 3
+
+# Run in the child: time the import, then report it and the heavy top-level packages it loaded
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+heavy = sorted({{name.split('.')[0] for name in {heavy!r}}} & set(sys.modules))
+print(json.dumps({{"seconds": seconds, "heavy": heavy}}))
+"""
+
+
+def measure(module, repeat=DEFAULT_REPEAT):
+    """{"seconds", "heavy"} of a cold import of `module`, the fastest of `repeat` fresh interpreters."""
+    root = os.path.dirname(os.path.abspath(__file__))
+    # Without BASKETBUDDY_PRELOAD, which imports the heavy modules on purpose
+    env = {key: value for key, value in os.environ.items() if key != 'BASKETBUDDY_PRELOAD'}
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [root, env.get('PYTHONPATH')]))
+    runs = []
+    # The bots create their cache directories in the working directory when imported
+    with tempfile.TemporaryDirectory() as workdir:
+        for _ in range(repeat):
+            output = subprocess.run([sys.executable, '-c', PROBE.format(module=module, heavy=HEAVY_MODULES)], cwd=workdir,
+                                    env=env, capture_output=True, text=True, check=True).stdout
+            runs.append(json.loads(output.splitlines()[-1]))
+    return min(runs, key=lambda run: run['seconds'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('scripts', nargs='*', default=SCRIPTS, help="Modules to import")
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET, help="Seconds allowed for each import")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="Imports per script; the fastest counts")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for module in args.scripts:
+        result = measure(module, args.repeat)
+        problems = []
+        if result['seconds'] > args.budget:
+            problems.append(f"over the {args.budget:.2f} s budget")
+        if result['heavy']:
+            problems.append("imports " + ", ".join(result['heavy']))
+        failed = failed or bool(problems)
+        print(f"{module}: {result['seconds']:.2f} s" + (" - " + "; ".join(problems) if problems else ""))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())